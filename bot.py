@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
 import logging
 import os
 import re
+import signal
+import threading
 import time
 from datetime import datetime, timedelta
+from typing import Callable, Optional
 
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardRemove
 from telegram.ext import (
@@ -19,8 +23,11 @@ from telegram.ext import (
 from telegram.error import BadRequest, NetworkError
 
 import database as db
+from config import DEFAULT_EXPIRY_HOURS
 import excel
 from excel import MONTHS_UA
+from delivery import CircuitBreaker, OutboundQueue, is_retryable
+from report_writer import ReportWriter
 
 
 logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
@@ -31,6 +38,25 @@ ASK_DATE, ASK_POSITION, ASK_SHOP = range(3)
 ADD_MANAGER_ID = range(3, 4)
 EMPLOYEE_MENU, ADD_EMPLOYEE_NAME, ADD_EMPLOYEE_ID, DELETE_EMPLOYEE_ID = range(4, 8)
 
+# За скільки останніх днів /stats рахує перцентилі часу закриття заявок.
+FILL_STATS_DAYS = 90
+
+# Максимальна довжина тексту одного повідомлення Telegram.
+MESSAGE_LIMIT = 4096
+
+# Скільки працівників показувати на одній сторінці списку для видалення.
+EMPLOYEES_PAGE_SIZE = 10
+
+# Назва задачі, яка спрацьовує на найближчий дедлайн pending-заявки (див. schedule_expiry).
+EXPIRY_JOB_NAME = "expire_pending_replacements"
+_expiry_lock = threading.Lock()
+
+# Як часто (у секундах) резервна задача заново планує дедлайн, якщо основну задачу пропущено.
+EXPIRY_RESCHEDULE_INTERVAL = 3600
+
+# Як часто (у секундах) зміни username записуються в базу.
+USERNAME_FLUSH_INTERVAL = 5
+
 
 def get_main_keyboard(role: str) -> ReplyKeyboardMarkup:
     keyboard = [[KeyboardButton("Знайти заміну")]]
@@ -160,6 +186,9 @@ def ask_shop_handler(update: Update, context: CallbackContext) -> int:
     shop_name = context.user_data['replacement_shop']
 
     repl_id = db.add_replacement(db_path, user.id, user.username or user.first_name, context.user_data['replacement_date'], context.user_data['replacement_position'], shop_name)
+    # Дедлайн нової заявки не раніший за вже запланований, тож планувати треба, лише якщо задачі немає.
+    if not context.job_queue.get_jobs_by_name(EXPIRY_JOB_NAME):
+        schedule_expiry(context.job_queue, config)
 
     cfg = shop_config[shop_name]
     msg_text = (
@@ -172,32 +201,55 @@ def ask_shop_handler(update: Update, context: CallbackContext) -> int:
     )
     kb = [[InlineKeyboardButton("✅ Взяти заміну", callback_data=f"take_{repl_id}")]]
 
-    try:
-        msg = context.bot.send_message(
-            chat_id=cfg['chat_id'],
-            text=msg_text,
-            reply_markup=InlineKeyboardMarkup(kb),
+    outbound = context.bot_data['outbound']
+    status_chat_id, status_message_id = query.message.chat_id, query.message.message_id
+
+    def on_posted(msg):
+        db.update_replacement_message_id(db_path, repl_id, msg.message_id, msg.chat_id)
+
+    def report_post_result(future):
+        # Виконується в потоці черги після надсилання: диспетчер не чекає на групу.
+        error = future.exception()
+        if error is None:
+            status_text = "✅ **Заявку створено!**\n\nВаш запит на заміну було успішно створено та надіслано у відповідну групу."
+        elif isinstance(error, BadRequest):
+            logger.error(f"Помилка відправки в чат {cfg['chat_id']} для магазину '{shop_name}': {error.message}")
+            status_text = "❌ **Невідома помилка**\n\nСталася помилка при відправці. Зверніться до розробника."
+            if 'chat not found' in str(error).lower():
+                status_text = (
+                    f"❌ **Помилка: Чат не знайдено!**\n\n"
+                    f"Не вдалося надіслати повідомлення для магазину **'{shop_name}'**.\n\n"
+                    f"**Можливі причини:**\n"
+                    f"1. Бот не був доданий до групи з `chat_id`: `{cfg['chat_id']}`.\n"
+                    f"2. Вказаний `chat_id` є неправильним.\n\n"
+                    f"**Що робити:**\n"
+                    f"1. Додайте бота до відповідної групи.\n"
+                    f"2. Перевірте `chat_id` в файлі `config.py`."
+                )
+        else:
+            status_text = "❌ **Не вдалося надіслати заявку в групу.**\n\nЗверніться до розробника."
+        outbound.submit(
+            status_chat_id,
+            context.bot.edit_message_text,
+            chat_id=status_chat_id,
+            message_id=status_message_id,
+            text=status_text,
             parse_mode='Markdown',
-            message_thread_id=cfg.get('thread_id')  # Відправка в конкретну гілку
+            description=f"статус заявки {repl_id}",
         )
-        db.update_replacement_message_id(db_path, repl_id, msg.message_id, msg.chat_id)
-        query.edit_message_text("✅ **Заявку створено!**\n\nВаш запит на заміну було успішно створено та надіслано у відповідну групу.", parse_mode='Markdown')
-    except BadRequest as e:
-        logger.error(f"Помилка відправки в чат {cfg['chat_id']} для магазину '{shop_name}': {e.message}")
-        error_text = "❌ **Невідома помилка**\n\nСталася помилка при відправці. Зверніться до розробника."
-        if 'chat not found' in str(e).lower():
-            error_text = (
-                f"❌ **Помилка: Чат не знайдено!**\n\n"
-                f"Не вдалося надіслати повідомлення для магазину **'{shop_name}'**.\n\n"
-                f"**Можливі причини:**\n"
-                f"1. Бот не був доданий до групи з `chat_id`: `{cfg['chat_id']}`.\n"
-                f"2. Вказаний `chat_id` є неправильним.\n\n"
-                f"**Що робити:**\n"
-                f"1. Додайте бота до відповідної групи.\n"
-                f"2. Перевірте `chat_id` в файлі `config.py`."
-            )
-        query.edit_message_text(error_text, parse_mode='Markdown')
 
+    query.edit_message_text("⏳ **Заявку створено!**\n\nНадсилаю її у відповідну групу, статус оновиться тут.", parse_mode='Markdown')
+    outbound.submit(
+        cfg['chat_id'],
+        context.bot.send_message,
+        chat_id=cfg['chat_id'],
+        text=msg_text,
+        reply_markup=InlineKeyboardMarkup(kb),
+        parse_mode='Markdown',
+        message_thread_id=cfg.get('thread_id'),  # Відправка в конкретну гілку
+        on_success=on_posted,
+        description=f"заявка {repl_id} в групу",
+    ).add_done_callback(report_post_result)
 
     user_info = db.get_user(db_path, user.id)
     if user_info:
@@ -210,7 +262,6 @@ def take_replacement_handler(update: Update, context: CallbackContext) -> None:
     config = context.bot_data['config']
     db_path = config['db_path']
     employees_db_path = config['employees_db_path']
-    reports_dir = config['reports_dir']
     query = update.callback_query
     user = update.effective_user
 
@@ -218,16 +269,12 @@ def take_replacement_handler(update: Update, context: CallbackContext) -> None:
     db.update_user_username(db_path, user.id, user.username or user.full_name)
 
     repl_id = int(query.data.split('_')[1])
-    repl_data = db.get_replacement(db_path, repl_id)
+    employee_data = db.get_employee(employees_db_path, user.id)
+    worker_full_name = employee_data['full_name'] if employee_data else user.full_name
 
-    if repl_data and repl_data['status'] == 'pending':
-        
-        employee_data = db.get_employee(employees_db_path, user.id)
-        worker_full_name = employee_data['full_name'] if employee_data else user.full_name
-        
-        db.take_replacement(db_path, repl_id, user.id, worker_full_name, user.username)
+    full_details = db.take_replacement(db_path, repl_id, user.id, worker_full_name, user.username)
 
-        
+    if full_details:
         escaped_username = user.username.replace('_', r'\_') if user.username else None
         mention = f"@{escaped_username}" if escaped_username else f"[{worker_full_name}](tg://user?id={user.id})"
 
@@ -241,38 +288,160 @@ def take_replacement_handler(update: Update, context: CallbackContext) -> None:
             f"👤 Працівник: {mention}\n\n"
             f"❤️‍🔥 Дякую за оперативність! Пам'ятаймо - коли свої підставляють плече — усім легше! ❤️‍🔥"
         )
-        query.edit_message_text(new_text, parse_mode='Markdown')
+        context.bot_data['outbound'].submit(
+            query.message.chat_id,
+            query.edit_message_text,
+            new_text,
+            parse_mode='Markdown',
+            description=f"взяття заявки {repl_id}",
+        )
         query.answer("Дякуємо! Ви взяли цю заміну. ✨")
 
-       
-        full_details = db.get_full_replacement_details(db_path, repl_id)
-        if full_details:
-            
-            employee_data = db.get_employee(employees_db_path, user.id)
-            worker_full_name = employee_data['full_name'] if employee_data else user.full_name
-
-            full_details['replacement_worker_full_name'] = worker_full_name
-            full_details['replacement_worker_username'] = user.username
-            full_details['replacement_worker_id'] = user.id
-            excel.record_replacement_to_excel(reports_dir, full_details)
+        context.bot_data['report_writer'].record([full_details])
     else:
         query.answer("⚠️ Цю заміну вже взяли або скасували.", show_alert=True)
 
 def send_report_handler(update: Update, context: CallbackContext) -> None:
-    config = context.bot_data['config']
-    reports_dir = config['reports_dir']
-    filepath = excel.get_report_filename(reports_dir)
-    if os.path.exists(filepath):
-        with open(filepath, 'rb') as doc:
-            update.message.reply_document(
-                document=doc,
-                filename=os.path.basename(filepath),
-                caption=f"📊 **Звіт по замінах**\n\nОсь актуальний звіт у форматі `.xlsx`.",
-                parse_mode='Markdown'
-            )
+    filepath = context.bot_data['report_writer'].build()
+    if filepath:
+        send_document_file(
+            context.bot,
+            context.bot_data['config']['db_path'],
+            update.effective_chat.id,
+            filepath,
+            caption=f"📊 **Звіт по замінах**\n\nОсь актуальний звіт у форматі `.xlsx`.",
+            parse_mode='Markdown'
+        )
     else:
         update.message.reply_text("🤷‍♂️ Файл звіту ще не було створено для поточного періоду.")
 
+def report_command_handler(update: Update, context: CallbackContext) -> None:
+    """/report ММ.РРРР - звіт за будь-який місяць; без аргументу - список місяців, за які є дані."""
+    config = context.bot_data['config']
+    db_path = config['db_path']
+    user_info = db.get_user(db_path, update.effective_user.id)
+    if not user_info or user_info['role'] != 'developer':
+        update.message.reply_text("❌ Ця команда доступна лише розробникам.")
+        return
+
+    match = re.match(r'^(\d{1,2})\.(\d{4})$', context.args[0]) if context.args else None
+    if not match or not 1 <= int(match.group(1)) <= 12:
+        months = db.get_report_months(db_path)
+        if not months:
+            update.message.reply_text("🤷‍♂️ Ще немає жодного звіту.")
+            return
+        lines = []
+        for month in months:
+            year, month_number = month['report_month'].split('-')
+            lines.append(f"• {MONTHS_UA[int(month_number)]} {year} — `{month_number}.{year}` (записів: {month['events']})")
+        update.message.reply_text(
+            "📅 **Доступні звіти**\n\n" + "\n".join(lines) + "\n\nНадішліть `/report ММ.РРРР`, щоб отримати звіт за місяць.",
+            parse_mode='Markdown'
+        )
+        return
+
+    for_date = datetime(int(match.group(2)), int(match.group(1)), 1)
+    filepath = context.bot_data['report_writer'].build(for_date=for_date)
+    if not filepath:
+        update.message.reply_text(f"🤷‍♂️ Даних за {for_date.month:02d}.{for_date.year} немає.")
+        return
+    send_document_file(
+        context.bot,
+        db_path,
+        update.effective_chat.id,
+        filepath,
+        caption=f"📊 **Звіт по замінах**\n\n{MONTHS_UA[for_date.month]} {for_date.year}.",
+        parse_mode='Markdown'
+    )
+
+def format_duration(seconds: float) -> str:
+    """Тривалість у вигляді '3 год 05 хв' або '12 хв'."""
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes} хв"
+    return f"{minutes // 60} год {minutes % 60:02d} хв"
+
+def format_stats_line(stat: dict) -> str:
+    closed = stat['taken'] + stat['expired']
+    fill_rate = f"{stat['taken'] * 100 // closed}%" if closed else "—"
+    avg_fill = format_duration(stat['fill_seconds_total'] / stat['fill_samples']) if stat['fill_samples'] else "—"
+    return (
+        f"• {stat['name'] or 'без назви'}: заявок {stat['created']}, закрито {fill_rate}, "
+        f"прострочено {stat['expired']}, ⌀ час закриття {avg_fill}"
+    )
+
+def format_cache_stats(stats: dict) -> str:
+    lookups = stats['hits'] + stats['misses']
+    hit_rate = f"{stats['hits'] * 100 // lookups}%" if lookups else "—"
+    return f"влучань {stats['hits']}, промахів {stats['misses']} ({hit_rate}), записів {stats['size']}"
+
+def split_message(sections: list, limit: int = MESSAGE_LIMIT) -> list:
+    """Розбиває розділи тексту на повідомлення не довші за limit; кожен розділ починає нове повідомлення, рядки не розриваються."""
+    messages = []
+    for section in sections:
+        current = ""
+        for line in section.split("\n"):
+            candidate = f"{current}\n{line}" if current else line
+            if len(candidate) > limit and current:
+                messages.append(current)
+                current = line[:limit]
+            else:
+                current = candidate[:limit]
+        if current.strip():
+            messages.append(current)
+    return messages
+
+def format_fill_times_line(name: str, stats: dict) -> str:
+    return (
+        f"• {name or 'без назви'}: p50 {format_duration(stats['p50'])}, p90 {format_duration(stats['p90'])}, "
+        f"p99 {format_duration(stats['p99'])} (заявок: {stats['count']})"
+    )
+
+def stats_command_handler(update: Update, context: CallbackContext) -> None:
+    """/stats - зведена статистика заявок по магазинах і посадах (з готових агрегатів)."""
+    config = context.bot_data['config']
+    db_path = config['db_path']
+    user_info = db.get_user(db_path, update.effective_user.id)
+    if not user_info or user_info['role'] != 'developer':
+        update.message.reply_text("❌ Ця команда доступна лише розробникам.")
+        return
+
+    by_shop = db.get_replacement_stats(db_path, 'shop')
+    if not by_shop:
+        update.message.reply_text("🤷‍♂️ Ще немає жодної заявки.")
+        return
+    by_position = db.get_replacement_stats(db_path, 'position')
+
+    total = {'name': 'Усього'}
+    for key in ('created', 'taken', 'expired', 'fill_seconds_total', 'fill_samples'):
+        total[key] = sum(stat[key] for stat in by_shop)
+
+    fill_times = db.get_fill_time_percentiles(db_path, since_ts=int(time.time()) - FILL_STATS_DAYS * 86400)
+    if fill_times['city']:
+        fill_times_text = (
+            f"⏱ Час закриття за {FILL_STATS_DAYS} днів:\n"
+            + format_fill_times_line("Усе місто", fill_times['city']) + "\n"
+            + "\n".join(format_fill_times_line(shop, stats) for shop, stats in fill_times['shops'].items())
+        )
+    else:
+        fill_times_text = f"⏱ За {FILL_STATS_DAYS} днів немає взятих заявок з відомим часом закриття."
+
+    cache = db.cache_stats()
+    # Розділи йдуть окремими повідомленнями: у місті з багатьма магазинами весь текст перевищує ліміт Telegram.
+    sections = [
+        f"📈 Статистика замін ({config.get('city_name', 'Місто')})\n\n"
+        f"{format_stats_line(total)}\n\n"
+        "Закрито - частка взятих серед завершених (взятих і прострочених) заявок.\n"
+        f"Черга надсилання: {context.bot_data['outbound'].depth()}\n"
+        f"Кеш користувачів: {format_cache_stats(cache['users'])}\n"
+        f"Кеш працівників: {format_cache_stats(cache['employees'])}",
+        "🏪 По магазинах:\n" + "\n".join(format_stats_line(stat) for stat in by_shop),
+        "👷 По посадах:\n" + "\n".join(format_stats_line(stat) for stat in by_position),
+        fill_times_text,
+    ]
+    for text in split_message(sections):
+        update.message.reply_text(text)
+
 def add_manager_start(update: Update, context: CallbackContext) -> int:
     update.message.reply_text("➕ **Додавання керівника**\n\nВведіть Telegram User ID нового керівника.\nДля скасування введіть /cancel.", parse_mode='Markdown')
     return ADD_MANAGER_ID
@@ -344,59 +513,126 @@ def scheduled_report_task(context: CallbackContext) -> None:
         logger.warning(f"Планувальник ({reports_dir}): не знайдено розробників для відправки звіту.")
         return
 
-    def send_and_delete(filepath: str, caption: str):
-        if os.path.exists(filepath):
+    def send_to_developers(filepath: Optional[str], caption: str):
+        if filepath and os.path.exists(filepath):
             filename = os.path.basename(filepath)
             logger.info(f"Надсилання звіту '{filename}' всім розробникам ({reports_dir}).")
+            # Темп надсилання визначає черга бота. Файл не видаляється: дані лишаються в журналі,
+            # а сам файл - кеш, який можна будь-коли перезібрати командою /report.
             for dev in developers:
-                try:
-                    with open(filepath, 'rb') as doc:
-                        context.bot.send_document(dev['user_id'], document=doc, filename=filename, caption=caption)
-                        time.sleep(2)
-                except Exception as e:
-                    logger.error(f"Не вдалося надіслати звіт розробнику {dev['user_id']} ({reports_dir}): {e}")
-            os.remove(filepath)
-            logger.info(f"Файл {filepath} видалено.")
+                context.bot_data['outbound'].submit(
+                    dev['user_id'],
+                    send_document_file,
+                    context.bot,
+                    db_path,
+                    dev['user_id'],
+                    filepath,
+                    caption,
+                    description=f"звіт '{filename}' розробнику {dev['user_id']}",
+                )
         else:
-            logger.warning(f"Планувальник ({reports_dir}): файл звіту {filepath} не знайдено. Пропускаю.")
+            logger.warning(f"Планувальник ({reports_dir}): немає даних для звіту за минулий місяць. Пропускаю.")
 
     city_name = config.get('city_name', 'Місто')
 
     
     if now.day == 1:
         prev_month_date = now - timedelta(days=1)
-        filepath = excel.get_report_filename(reports_dir, for_date=prev_month_date)
+        filepath = context.bot_data['report_writer'].build(for_date=prev_month_date)
         
         
         month_name = excel.MONTHS_UA[prev_month_date.month]
 
         caption = f"📊 Щомісячний звіт ({city_name})\n\nОсь повний звіт по замінах за {month_name}."
-        send_and_delete(filepath, caption)
+        send_to_developers(filepath, caption)
+
+def file_sha256(filepath: str) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def send_document_file(bot, db_path: str, chat_id: int, filepath: str, caption: str, **kwargs):
+    """
+    Надсилає файл документом. Якщо файл з таким самим вмістом уже завантажувався, надсилається
+    його file_id без повторного завантаження; file_id перевіряється в момент надсилання,
+    тож у розсилці через чергу файл завантажується лише для першого отримувача.
+    """
+    sha256 = file_sha256(filepath)
+    file_id = db.get_uploaded_file_id(db_path, filepath, sha256)
+    if file_id:
+        try:
+            return bot.send_document(chat_id, document=file_id, caption=caption, **kwargs)
+        except BadRequest as e:
+            logger.warning(f"Telegram не прийняв збережений file_id для {filepath} ({e}), завантажую файл заново.")
+            db.forget_uploaded_file(db_path, filepath)
+
+    with open(filepath, 'rb') as doc:
+        msg = bot.send_document(chat_id, document=doc, filename=os.path.basename(filepath), caption=caption, **kwargs)
+    if msg.document:
+        db.save_uploaded_file_id(db_path, filepath, sha256, msg.document.file_id)
+    return msg
+
+def hours_text(hours: int) -> str:
+    """Число годин з правильною формою слова: 1 година, 24 години, 48 годин."""
+    if hours % 10 == 1 and hours % 100 != 11:
+        return f"{hours} година"
+    if hours % 10 in (2, 3, 4) and hours % 100 not in (12, 13, 14):
+        return f"{hours} години"
+    return f"{hours} годин"
+
+def schedule_expiry(job_queue, config: dict) -> None:
+    """
+    Планує одну задачу expire_pending_replacements точно на найближчий дедлайн: найстаріша
+    pending-заявка береться з бази (частковий індекс за created_at), тож без заявок задач немає.
+    """
+    with _expiry_lock:
+        for job in job_queue.get_jobs_by_name(EXPIRY_JOB_NAME):
+            job.schedule_removal()
+        oldest_created_at = db.get_oldest_pending_created_at(config['db_path'])
+        if oldest_created_at is None:
+            return
+        deadline = oldest_created_at + config.get('expiry_hours', DEFAULT_EXPIRY_HOURS) * 3600
+        job_queue.run_once(
+            expire_pending_replacements,
+            when=max(0, deadline - time.time()),
+            context=config,
+            name=EXPIRY_JOB_NAME,
+            # Запізніле спрацювання (зупинка процесу, стрибок годинника) виконується, а не відкидається.
+            job_kwargs={'misfire_grace_time': None}
+        )
+
+def reschedule_expiry_job(context: CallbackContext) -> None:
+    """Резервно перепланує задачу дедлайну: втрачене спрацювання не зупиняє прострочення назавжди."""
+    schedule_expiry(context.job_queue, context.job.context)
 
 def expire_pending_replacements(context: CallbackContext) -> None:
-    """Автоматично завершує заявки, на які не відповіли протягом 48 годин."""
+    """Завершує заявки, на які не відповіли протягом expiry_hours годин, і планує наступний дедлайн."""
     config = context.job.context if context.job else None
     if not config:
         logger.warning("Планувальник прострочених заявок: відсутні налаштування міста.")
         return
 
     db_path = config['db_path']
-    reports_dir = config['reports_dir']
-    cutoff = (datetime.now() - timedelta(hours=48)).strftime('%Y-%m-%d %H:%M:%S')
+    expiry_hours = config.get('expiry_hours', DEFAULT_EXPIRY_HOURS)
+    cutoff = int(time.time()) - expiry_hours * 3600
 
-    stale_requests = db.get_pending_replacements_older_than(db_path, cutoff)
-    if not stale_requests:
+    try:
+        expired_requests = db.expire_pending_replacements_older_than(db_path, cutoff)
+    finally:
+        schedule_expiry(context.job_queue, config)
+    if not expired_requests:
         return
 
-    for request in stale_requests:
-        repl_id = request['id']
-        logger.info(f"Заявка {repl_id} не взята понад 48 годин. Позначаю як прострочену.")
-        db.expire_replacement(db_path, repl_id)
+    logger.info(f"Заявки {[request['id'] for request in expired_requests]} не взяті понад {expiry_hours} год. Позначено як прострочені.")
 
+    for request in expired_requests:
+        repl_id = request['id']
         chat_id = request.get('chat_id')
         message_id = request.get('message_id')
         expired_text = (
-            "⏰ **Заявку не закрито 48 годин**\n\n"
+            f"⏰ **Заявку не закрито {hours_text(expiry_hours)}**\n\n"
             "📋 Деталі:\n"
             f"🔹 Дата: {request['request_date']}\n"
             f"🔹 Посада: {request['position']}\n"
@@ -404,24 +640,45 @@ def expire_pending_replacements(context: CallbackContext) -> None:
             "Статус: заміну не знайдено."
         )
         if chat_id and message_id:
-            try:
-                context.bot.edit_message_text(
-                    chat_id=chat_id,
-                    message_id=message_id,
-                    text=expired_text,
-                    parse_mode='Markdown'
-                )
-            except BadRequest as e:
-                logger.warning(f"Не вдалося оновити повідомлення для заявки {repl_id}: {e}")
-
-        details = db.get_full_replacement_details(db_path, repl_id)
-        if details:
-            details['replacement_worker_full_name'] = ''
-            details['replacement_worker_username'] = ''
-            details['replacement_worker_id'] = None
-            excel.record_replacement_to_excel(reports_dir, details)
-        else:
-            logger.warning(f"Не знайдено деталі заявки {repl_id} для запису у звіт.")
+            context.bot_data['outbound'].submit(
+                chat_id,
+                context.bot.edit_message_text,
+                chat_id=chat_id,
+                message_id=message_id,
+                text=expired_text,
+                parse_mode='Markdown',
+                description=f"прострочення заявки {repl_id}",
+            )
+
+        request['replacement_worker_full_name'] = ''
+        request['replacement_worker_username'] = ''
+        request['replacement_worker_id'] = None
+
+    context.bot_data['report_writer'].record(expired_requests)
+
+def flush_usernames_job(context: CallbackContext) -> None:
+    """Записує в базу накопичені зміни username користувачів."""
+    config = context.job.context if context.job else None
+    if not config:
+        return
+    try:
+        db.flush_usernames(config['db_path'])
+    except Exception as e:
+        logger.warning(f"Не вдалося записати зміни username ({config['db_path']}): {e}")
+
+def checkpoint_databases(context: CallbackContext) -> None:
+    """Періодично переносить WAL-журнали баз міста в основні файли, щоб вони не розросталися."""
+    config = context.job.context if context.job else None
+    if not config:
+        return
+
+    for path in (config['db_path'], config['employees_db_path']):
+        try:
+            busy, log_frames, checkpointed = db.checkpoint(path)
+            if busy:
+                logger.info(f"Checkpoint {path}: базу зайнято, перенесено {checkpointed} з {log_frames} сторінок.")
+        except Exception as e:
+            logger.warning(f"Не вдалося виконати checkpoint для {path}: {e}")
 
 def employees_menu_start(update: Update, context: CallbackContext) -> int:
     """Показує головне меню управління працівниками."""
@@ -499,55 +756,101 @@ def ask_employee_id_handler(update: Update, context: CallbackContext) -> int:
         return ADD_EMPLOYEE_ID
 
 def show_employees_for_deletion(update: Update, context: CallbackContext) -> int:
-    """Показує список працівників для видалення."""
+    """Показує першу сторінку списку працівників для видалення."""
+    context.user_data.pop('employees_page', None)
+    return render_employees_page(update, context)
+
+def render_employees_page(update: Update, context: CallbackContext, cursor=None, backward: bool = False, inclusive: bool = False) -> int:
+    """
+    Показує одну сторінку працівників (одним запитом до бази та одним редагуванням повідомлення)
+    з кнопками видалення та гортання. Межі сторінки зберігаються в user_data['employees_page'].
+    """
     config = context.bot_data['config']
     employees_db_path = config['employees_db_path']
-    employees = db.get_all_employees(employees_db_path)
     query = update.callback_query
-    
+
+    employees, more = db.get_employees_page(employees_db_path, cursor, backward, inclusive, EMPLOYEES_PAGE_SIZE)
+    if not employees and cursor is not None:
+        # На цій сторінці нікого не лишилося - повертаємось на початок списку.
+        context.user_data.pop('employees_page', None)
+        return render_employees_page(update, context)
+
     if not employees:
         query.edit_message_text("🤷‍♂️ Список порожній\n\nНаразі немає жодного працівника для видалення.")
         user = update.effective_user
         db_path = config['db_path']
         user_info = db.get_user(db_path, user.id)
         update.effective_message.reply_text("Ви повернулись у головне меню.", reply_markup=get_main_keyboard(user_info['role']))
+        context.user_data.pop('employees_page', None)
         return ConversationHandler.END
 
-    header = "👇 **Оберіть працівника для видалення** 👇\n\n"
-    lines = [f"• {emp['full_name']} (ID: `{emp['user_id']}`)\n" for emp in employees]
-    instructions = "\nНадішліть ID працівника, якого потрібно видалити або скористайтесь `/cancel`."
-    max_length = 3800
-
-    chunks = []
-    current = header
-    for line in lines:
-        if len(current) + len(line) > max_length:
-            chunks.append(current.rstrip())
-            current = ""
-        if not current:
-            current = ""
-        current += line
-    if current:
-        chunks.append(current.rstrip())
-
-    instructions_message = instructions.strip()
-    if chunks:
-        if len(chunks[-1]) + len(instructions) <= max_length:
-            chunks[-1] = chunks[-1] + instructions
-            instructions_message = None
-
-    cancel_keyboard = ReplyKeyboardMarkup([[KeyboardButton("/cancel")]], resize_keyboard=True)
-    query.edit_message_text("📋 Список працівників доступний нижче.")
-
-    for index, chunk in enumerate(chunks):
-        reply_markup = cancel_keyboard if index == 0 else None
-        query.message.reply_text(chunk, parse_mode='Markdown', reply_markup=reply_markup)
-
-    if instructions_message:
-        query.message.reply_text(instructions_message, parse_mode='Markdown', reply_markup=None)
-
+    page = context.user_data.get('employees_page', {})
+    if backward:
+        has_prev, has_next = more, True
+    elif inclusive:
+        has_prev, has_next = page.get('has_prev', False), more
+    else:
+        has_prev, has_next = cursor is not None, more
+    context.user_data['employees_page'] = {
+        'first': (employees[0]['full_name'], employees[0]['user_id']),
+        'last': (employees[-1]['full_name'], employees[-1]['user_id']),
+        'has_prev': has_prev,
+        'has_next': has_next,
+    }
+
+    text = (
+        "👇 **Оберіть працівника для видалення** 👇\n\n"
+        + "".join(f"• {emp['full_name']} (ID: `{emp['user_id']}`)\n" for emp in employees)
+        + "\nНатисніть кнопку з ім'ям, надішліть ID працівника або скористайтесь `/cancel`."
+    )
+    keyboard = [[InlineKeyboardButton(f"🗑 {emp['full_name']}", callback_data=f"emp_del_{emp['user_id']}")] for emp in employees]
+    navigation = []
+    if has_prev:
+        navigation.append(InlineKeyboardButton("⬅️ Назад", callback_data="emp_page_prev"))
+    if has_next:
+        navigation.append(InlineKeyboardButton("Далі ➡️", callback_data="emp_page_next"))
+    if navigation:
+        keyboard.append(navigation)
+    keyboard.append([InlineKeyboardButton("✅ Готово", callback_data="emp_page_close")])
+
+    query.edit_message_text(text, parse_mode='Markdown', reply_markup=InlineKeyboardMarkup(keyboard))
     return DELETE_EMPLOYEE_ID
 
+def employees_pager_handler(update: Update, context: CallbackContext) -> int:
+    """Гортання списку працівників та видалення кнопкою."""
+    config = context.bot_data['config']
+    query = update.callback_query
+    page = context.user_data.get('employees_page')
+
+    if query.data == "emp_page_close":
+        query.answer()
+        query.edit_message_text("👌 Список працівників закрито.")
+        context.user_data.pop('employees_page', None)
+        user_info = db.get_user(config['db_path'], update.effective_user.id)
+        update.effective_message.reply_text("Ви повернулись у головне меню.", reply_markup=get_main_keyboard(user_info['role']))
+        return ConversationHandler.END
+
+    if page is None:
+        query.answer()
+        return render_employees_page(update, context)
+
+    if query.data == "emp_page_next":
+        query.answer()
+        return render_employees_page(update, context, cursor=page['last'])
+    if query.data == "emp_page_prev":
+        query.answer()
+        return render_employees_page(update, context, cursor=page['first'], backward=True)
+
+    employees_db_path = config['employees_db_path']
+    user_id_to_delete = int(query.data.split('_')[2])
+    employee = db.get_employee(employees_db_path, user_id_to_delete)
+    if employee:
+        db.delete_employee(employees_db_path, user_id_to_delete)
+        query.answer(f"✅ Працівника {employee['full_name']} видалено!")
+    else:
+        query.answer("Цього працівника вже видалено.")
+    return render_employees_page(update, context, cursor=page['first'], inclusive=True)
+
 def delete_employee_handler(update: Update, context: CallbackContext) -> int:
     """Видаляє працівника за введеним ID."""
     config = context.bot_data['config']
@@ -576,24 +879,48 @@ def delete_employee_handler(update: Update, context: CallbackContext) -> int:
         return DELETE_EMPLOYEE_ID
 
 
-def run_bot(config: dict) -> None:
-    """Налаштовує та запускає один екземпляр бота з заданою конфігурацією."""
+def build_updater(config: dict, workers: int = 4) -> Updater:
+    """Створює Updater міста з усіма обробниками та задачами планувальника, не запускаючи його."""
     token = config["telegram_bot_token"]
 
-    updater = Updater(token, use_context=True)
+    updater = Updater(token, workers=workers, use_context=True)
     dp = updater.dispatcher
 
     dp.bot_data['config'] = config
+    report_writer = ReportWriter(config['db_path'], config['reports_dir'])
+    dp.bot_data['report_writer'] = report_writer
+    # Запобіжник і черга надсилання з лімітами Telegram - окремі для кожного міста (бота).
+    dp.bot_data['outbound'] = OutboundQueue(CircuitBreaker(), name=f"outbound:{config['city_name']}")
+
+    storage_profile = config.get('storage_profile') or {}
+    db.configure_storage(config['db_path'], storage_profile)
+    db.configure_storage(config['employees_db_path'], storage_profile)
 
     job_queue = updater.job_queue
     job_queue.run_daily(scheduled_report_task, time=datetime.strptime("09:00", "%H:%M").time())
+    schedule_expiry(job_queue, config)
+    job_queue.run_repeating(
+        reschedule_expiry_job,
+        interval=EXPIRY_RESCHEDULE_INTERVAL,
+        first=EXPIRY_RESCHEDULE_INTERVAL,
+        context=config,
+        name="reschedule_expiry"
+    )
     job_queue.run_repeating(
-        expire_pending_replacements,
-        interval=3600,
-        first=600,
+        flush_usernames_job,
+        interval=USERNAME_FLUSH_INTERVAL,
+        first=USERNAME_FLUSH_INTERVAL,
         context=config,
-        name="expire_pending_replacements"
+        name="flush_usernames"
     )
+    if str(storage_profile.get('journal_mode', '')).upper() == 'WAL':
+        job_queue.run_repeating(
+            checkpoint_databases,
+            interval=storage_profile.get('checkpoint_interval', 900),
+            first=60,
+            context=config,
+            name="checkpoint_databases"
+        )
 
     add_manager_conv = ConversationHandler(
         entry_points=[MessageHandler(Filters.regex('^Додати керівника$'), add_manager_start)],
@@ -621,36 +948,138 @@ def run_bot(config: dict) -> None:
             EMPLOYEE_MENU: [CallbackQueryHandler(employee_menu_handler)],
             ADD_EMPLOYEE_NAME: [MessageHandler(Filters.text & ~Filters.command, ask_employee_name_handler)],
             ADD_EMPLOYEE_ID: [MessageHandler(Filters.text & ~Filters.command, ask_employee_id_handler)],
-            DELETE_EMPLOYEE_ID: [MessageHandler(Filters.text & ~Filters.command, delete_employee_handler)],
+            DELETE_EMPLOYEE_ID: [
+                CallbackQueryHandler(employees_pager_handler, pattern=r'^emp_(page_(next|prev|close)|del_\d+)$'),
+                MessageHandler(Filters.text & ~Filters.command, delete_employee_handler),
+            ],
         },
         fallbacks=[CommandHandler('cancel', cancel)],
         allow_reentry=True,
     )
     dp.add_handler(employee_conv)
 
-    dp.add_handler(CallbackQueryHandler(take_replacement_handler, pattern=r'^take_\d+$'))
-    dp.add_handler(MessageHandler(Filters.regex('^Надіслати таблицю$'), send_report_handler))
+    # Ці обробники не залежать від стану розмови, тож виконуються в пулі потоків диспетчера
+    # і не затримують інші оновлення, поки чекають на базу, збирання звіту чи Telegram.
+    dp.add_handler(CallbackQueryHandler(take_replacement_handler, pattern=r'^take_\d+$', run_async=True))
+    dp.add_handler(MessageHandler(Filters.regex('^Надіслати таблицю$'), send_report_handler, run_async=True))
+    dp.add_handler(CommandHandler("report", report_command_handler, filters=Filters.chat_type.private, run_async=True))
+    dp.add_handler(CommandHandler("stats", stats_command_handler, filters=Filters.chat_type.private, run_async=True))
     dp.add_handler(MessageHandler(Filters.regex('^Видалити керівника$'), remove_manager_menu))
     dp.add_handler(CallbackQueryHandler(confirm_delete_manager, pattern=r'^delete_manager_\d+$'))
     dp.add_handler(CallbackQueryHandler(cancel_deletion_handler, pattern=r'^cancel_deletion$'))
     dp.add_handler(CommandHandler("cancel", cancel))
     dp.add_error_handler(error_handler)
-
+    return updater
+
+def start_city_bot(updater: Updater, webhook_url: Optional[str] = None) -> None:
+    """
+    Запускає фонові потоки міста та отримання оновлень: опитування Telegram або, якщо задано
+    webhook_url, реєстрацію webhook <webhook_url>/<токен> (оновлення приймає спільний сервер webhook.py).
+    """
+    config = updater.dispatcher.bot_data['config']
     logger.info(f"Бот для '{config['city_name']}' запускається...")
-    try:
+    updater.dispatcher.bot_data['report_writer'].start()
+    updater.dispatcher.bot_data['outbound'].start()
+    if webhook_url:
+        updater.bot.set_webhook(url=f"{webhook_url.rstrip('/')}/{updater.bot.token}", drop_pending_updates=True)
+        updater.job_queue.start()
+        threading.Thread(target=updater.dispatcher.start, name=f"dispatcher:{config['city_name']}", daemon=True).start()
+    else:
         updater.start_polling(drop_pending_updates=True)
+
+def stop_city_bot(updater: Updater) -> None:
+    """Зупиняє опитування, дописує звіти, чергу надсилання та зміни username міста."""
+    bot_data = updater.dispatcher.bot_data
+    updater.stop()
+    if bot_data['report_writer'].is_alive():
+        bot_data['report_writer'].stop()
+    if bot_data['outbound'].is_alive():
+        bot_data['outbound'].stop()
+    db.flush_usernames(bot_data['config']['db_path'])
+
+def run_bot(config: dict, on_started: Optional[Callable[[], None]] = None) -> None:
+    """
+    Налаштовує та запускає один екземпляр бота з заданою конфігурацією.
+    on_started викликається після успішного start_polling (наприклад, щоб повідомити супервізор).
+    """
+    updater = build_updater(config)
+    try:
+        start_city_bot(updater)
         print(f"Бот {config['city_name']} | Status | - OK")
+        if on_started:
+            on_started()
         updater.idle()
     except Exception as e:
         logger.error(f"Помилка під час виконання `start_polling` для '{config['city_name']}': {e}")
         print(f"Бот {config['city_name']} | Status | - FAILED")
+    finally:
+        stop_city_bot(updater)
+
+def run_bots(configs: list, workers: int = 2, webhook_config: Optional[dict] = None) -> None:
+    """
+    Запускає ботів кількох міст в одному процесі: модулі, кеші та пул з'єднань спільні,
+    а конфігурація, бази й bot_data кожного міста - окремі. Блокує до сигналу зупинки.
+    Якщо задано webhook_config (див. config.WEBHOOK_CONFIG), оновлення всіх ботів приймає
+    один локальний HTTP-сервер замість окремого опитування Telegram для кожного бота.
+    """
+    updaters = []
+    routes = {}
+    server = None
+    if webhook_config:
+        import webhook  # Flask потрібен лише в режимі webhook.
+        server = webhook.WebhookServer(
+            routes, webhook_config['listen'], webhook_config['port'], webhook_config.get('record_path') or None
+        )
+        server.start()
+
+    for config in configs:
+        try:
+            updater = build_updater(config, workers=workers)
+        except Exception as e:
+            logger.error(f"Не вдалося налаштувати бота для '{config['city_name']}': {e}")
+            print(f"Бот {config['city_name']} | Status | - FAILED")
+            continue
+        token = config["telegram_bot_token"]
+        if server:
+            routes[token] = updater
+        try:
+            start_city_bot(updater, webhook_config['public_url'] if webhook_config else None)
+        except Exception as e:
+            logger.error(f"Помилка під час запуску бота для '{config['city_name']}': {e}")
+            print(f"Бот {config['city_name']} | Status | - FAILED")
+            routes.pop(token, None)
+            stop_city_bot(updater)
+            continue
+        updaters.append(updater)
+        print(f"Бот {config['city_name']} | Status | - OK")
+
+    if not updaters:
+        if server:
+            server.stop()
+        return
+
+    stop_event = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGABRT):
+        signal.signal(sig, lambda signum, frame: stop_event.set())
+    while not stop_event.wait(1):
+        pass
+
+    if server:
+        server.stop()
+    for updater in updaters:
+        stop_city_bot(updater)
 def error_handler(update: object, context: CallbackContext) -> None:
-    """Логує виключення від бібліотеки telegram та намагається коректно відновитися після мережевих збоїв."""
+    """
+    Логує виключення від бібліотеки telegram. Мережеві збої лише враховуються запобіжником бота:
+    потік не чекає, а невдалі надсилання повторює черга OutboundQueue.
+    """
     error = context.error
 
     if isinstance(error, NetworkError):
-        logger.warning("Тимчасова помилка мережі/Telegram API: %s. Повторюю наступну спробу через 5 секунд.", error)
-        time.sleep(5)
+        outbound = context.bot_data.get('outbound')
+        if outbound and is_retryable(error):
+            outbound.breaker.record_failure()
+        logger.warning("Тимчасова помилка мережі/Telegram API: %s.", error)
         return
 
     logger.exception("Неочікувана помилка в обробнику оновлень: %s", error)
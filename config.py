@@ -1,6 +1,30 @@
 
 import os
 
+# Налаштування SQLite для баз міста: застосовуються при ініціалізації та до кожного з'єднання.
+# checkpoint_interval - як часто (у секундах) бот переносить WAL-журнал в основний файл бази.
+DEFAULT_STORAGE_PROFILE = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -8000,
+    "mmap_size": 67108864,
+    "busy_timeout": 5000,
+    "checkpoint_interval": 900,
+}
+
+# Через скільки годин незакрита заявка автоматично позначається простроченою (можна змінити для міста).
+DEFAULT_EXPIRY_HOURS = 48
+
+# Режим webhook (python start.py --webhook): один локальний HTTP-сервер на listen:port приймає
+# оновлення всіх ботів. public_url - зовнішня HTTPS-адреса (наприклад, nginx), що проксує на цей сервер;
+# Telegram надсилає оновлення на <public_url>/<токен бота>. record_path - файл для запису оновлень
+# (для відтворення: python webhook.py replay <файл>), порожній - не записувати.
+WEBHOOK_CONFIG = {
+    "listen": os.getenv("BOT_WEBHOOK_LISTEN", "127.0.0.1"),
+    "port": int(os.getenv("BOT_WEBHOOK_PORT", "8443")),
+    "public_url": os.getenv("BOT_WEBHOOK_URL", ""),
+    "record_path": os.getenv("BOT_WEBHOOK_RECORD", ""),
+}
 
 CITIES_CONFIG = {
     "khmelnytskyi": {
@@ -9,6 +33,8 @@ CITIES_CONFIG = {
         "db_path": "instance/khmelnytskyi/bulka.db",
         "employees_db_path": "instance/khmelnytskyi/employees.db",
         "reports_dir": "instance/khmelnytskyi/reports",
+        "storage_profile": DEFAULT_STORAGE_PROFILE,
+        "expiry_hours": DEFAULT_EXPIRY_HOURS,
         "available_positions": [
             "Старший продавець",
             "Продавець-консультант (каса)",
@@ -47,6 +73,8 @@ CITIES_CONFIG = {
         "db_path": "instance/kamianets/bulka.db",
         "employees_db_path": "instance/kamianets/employees.db",
         "reports_dir": "instance/kamianets/reports",
+        "storage_profile": DEFAULT_STORAGE_PROFILE,
+        "expiry_hours": DEFAULT_EXPIRY_HOURS,
         "available_positions": [
             "Старший продавець",
             "Продавець-консультант (каса)",
@@ -78,6 +106,8 @@ CITIES_CONFIG = {
         "db_path": "instance/khmelnytskyi_vlasne/bulka.db",
         "employees_db_path": "instance/khmelnytskyi_vlasne/employees.db",
         "reports_dir": "instance/khmelnytskyi_vlasne/reports",
+        "storage_profile": DEFAULT_STORAGE_PROFILE,
+        "expiry_hours": DEFAULT_EXPIRY_HOURS,
         "available_positions": [
             "Зав. виробництва",
             "Старший зміни",
@@ -104,6 +134,8 @@ CITIES_CONFIG = {
         "db_path": "instance/kamianets_vlasne/bulka.db",
         "employees_db_path": "instance/kamianets_vlasne/employees.db",
         "reports_dir": "instance/kamianets_vlasne/reports",
+        "storage_profile": DEFAULT_STORAGE_PROFILE,
+        "expiry_hours": DEFAULT_EXPIRY_HOURS,
         "available_positions": [
             "Зав. виробництва",
             "Старший зміни",
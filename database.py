@@ -1,195 +1,479 @@
 # -*- coding: utf-8 -*-
+import hashlib
+import math
 import sqlite3
 import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Iterator, Optional, Tuple
 
-def init_db(db_path: str):
+from cache import MISSING, TTLCache
+
+# PRAGMA, які застосовуються до кожного нового з'єднання, якщо для бази не задано власних.
+DEFAULT_PRAGMAS: Dict[str, object] = {}
+
+# Ключі профілю зберігання (config.DEFAULT_STORAGE_PROFILE), які є PRAGMA SQLite.
+STORAGE_PRAGMAS = ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'busy_timeout')
+
+_pragmas: Dict[str, Dict[str, object]] = {}
+_local = threading.local()
+
+# Ролі та імена змінюються рідко, тож обробники читають їх із кешу процесу.
+# Ключ - (db_path, user_id); значення None теж кешується ("користувача немає").
+_users_cache = TTLCache(ttl=300)
+_employees_cache = TTLCache(ttl=300)
+# Останнє побачене employees_state.changes кожної бази працівників: якщо список змінив інший процес
+# (import_employees.py), лічильник зсувається і кеш цієї бази скидається (див. get_employee).
+_employees_versions: Dict[str, int] = {}
+
+# Останній відомий username кожного користувача та ще не записані зміни (див. flush_usernames).
+_known_usernames: Dict[tuple, str] = {}
+_pending_usernames: Dict[str, Dict[int, str]] = {}
+_usernames_lock = threading.Lock()
+
+
+def configure_connection(db_path: str, pragmas: Optional[Dict[str, object]] = None):
+    """Задає PRAGMA для з'єднань з базою db_path. Діє на з'єднання, відкриті після виклику."""
+    _pragmas[db_path] = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+    # З'єднання поточного потоку перевідкриється вже з новими PRAGMA.
+    con = getattr(_local, 'connections', {}).pop(db_path, None)
+    if con is not None:
+        con.close()
+
+
+def configure_storage(db_path: str, storage_profile: Optional[dict]):
+    """Застосовує профіль зберігання міста (WAL, synchronous, кеш, mmap, busy_timeout) до бази db_path."""
+    if not storage_profile:
+        return
+    configure_connection(db_path, {name: storage_profile[name] for name in STORAGE_PRAGMAS if name in storage_profile})
+
+
+def _get_connection(db_path: str) -> sqlite3.Connection:
+    """Повертає довгоживуче з'єднання поточного потоку (і процесу) з базою db_path."""
+    pid = os.getpid()
+    if getattr(_local, 'pid', None) != pid:
+        # Після fork з'єднання батьківського процесу використовувати не можна.
+        _local.pid = pid
+        _local.connections = {}
+    con = _local.connections.get(db_path)
+    if con is None:
+        con = sqlite3.connect(db_path)
+        for name, value in _pragmas.get(db_path, DEFAULT_PRAGMAS).items():
+            con.execute(f"PRAGMA {name} = {value}")
+        _local.connections[db_path] = con
+    return con
+
+
+@contextmanager
+def connection(db_path: str) -> Iterator[sqlite3.Connection]:
+    """Видає з'єднання потоку; фіксує транзакцію при успіху та відкочує при помилці."""
+    con = _get_connection(db_path)
+    try:
+        yield con
+    except Exception:
+        con.rollback()
+        raise
+    else:
+        con.commit()
+
+
+def cache_stats() -> dict:
+    """Повертає лічильники кешів користувачів і працівників."""
+    return {"users": _users_cache.stats(), "employees": _employees_cache.stats()}
+
+
+def close_connections():
+    """Закриває всі з'єднання поточного потоку."""
+    for con in getattr(_local, 'connections', {}).values():
+        con.close()
+    _local.connections = {}
+
+
+def checkpoint(db_path: str, mode: str = 'TRUNCATE'):
+    """Переносить WAL-журнал в основний файл бази. Повертає (busy, log, checkpointed)."""
+    with connection(db_path) as con:
+        return con.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+def init_db(db_path: str, storage_profile: Optional[dict] = None):
     """Ініціалізує базу даних, створює таблиці та виконує міграцію, якщо потрібно."""
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("PRAGMA foreign_keys = ON")
-
-    
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY,
-            username TEXT, -- Може бути NULL спочатку
-            role TEXT NOT NULL CHECK(role IN ('developer', 'manager'))
-        )
-    ''')
-
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS replacements (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            manager_id INTEGER, manager_username TEXT, request_date TEXT,
-            position TEXT, shop TEXT, status TEXT DEFAULT 'pending',
-            replacement_worker_id INTEGER, 
-            replacement_worker_full_name TEXT, 
-            replacement_worker_username TEXT,
-            message_id INTEGER, chat_id INTEGER,
-            FOREIGN KEY (manager_id) REFERENCES users (user_id)
-        )
-    ''')
+    configure_storage(db_path, storage_profile)
+    with connection(db_path) as con:
+        cur = con.cursor()
 
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS replacement_meta (
-            replacement_id INTEGER PRIMARY KEY,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY (replacement_id) REFERENCES replacements (id) ON DELETE CASCADE
-        )
-    ''')
-
-    cur.execute("PRAGMA table_info(replacements)")
-    columns = [column[1] for column in cur.fetchall()]
-    
-    if 'replacement_worker_full_name' not in columns:
-        print("Виконую міграцію: додаю колонку 'replacement_worker_full_name'...")
-        cur.execute("ALTER TABLE replacements ADD COLUMN replacement_worker_full_name TEXT")
-    
-    if 'replacement_worker_username' not in columns:
-        print("Виконую міграцію: додаю колонку 'replacement_worker_username'...")
-        cur.execute("ALTER TABLE replacements ADD COLUMN replacement_worker_username TEXT")
-
-    cur.execute("""
-        INSERT OR IGNORE INTO replacement_meta (replacement_id, created_at)
-        SELECT id, datetime('now') FROM replacements
-    """)
-
-    con.commit()
-    con.close()
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                user_id INTEGER PRIMARY KEY,
+                username TEXT, -- Може бути NULL спочатку
+                role TEXT NOT NULL CHECK(role IN ('developer', 'manager'))
+            )
+        ''')
+
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS replacements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                manager_id INTEGER, manager_username TEXT, request_date TEXT,
+                position TEXT, shop TEXT, status TEXT DEFAULT 'pending',
+                replacement_worker_id INTEGER, 
+                replacement_worker_full_name TEXT, 
+                replacement_worker_username TEXT,
+                message_id INTEGER, chat_id INTEGER,
+                created_at INTEGER, -- Unix-час створення заявки
+                taken_at INTEGER, -- Unix-час, коли заявку взяли
+                FOREIGN KEY (manager_id) REFERENCES users (user_id)
+            )
+        ''')
+
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS replacement_meta (
+                replacement_id INTEGER PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                FOREIGN KEY (replacement_id) REFERENCES replacements (id) ON DELETE CASCADE
+            )
+        ''')
+
+        cur.execute("PRAGMA table_info(replacements)")
+        columns = [column[1] for column in cur.fetchall()]
+        
+        if 'replacement_worker_full_name' not in columns:
+            print("Виконую міграцію: додаю колонку 'replacement_worker_full_name'...")
+            cur.execute("ALTER TABLE replacements ADD COLUMN replacement_worker_full_name TEXT")
+        
+        if 'replacement_worker_username' not in columns:
+            print("Виконую міграцію: додаю колонку 'replacement_worker_username'...")
+            cur.execute("ALTER TABLE replacements ADD COLUMN replacement_worker_username TEXT")
+
+        if 'created_at' not in columns:
+            print("Виконую міграцію: додаю колонку 'created_at'...")
+            cur.execute("ALTER TABLE replacements ADD COLUMN created_at INTEGER")
+
+        taken_at_added = 'taken_at' not in columns
+        if taken_at_added:
+            print("Виконую міграцію: додаю колонку 'taken_at'...")
+            cur.execute("ALTER TABLE replacements ADD COLUMN taken_at INTEGER")
+            # Тригер статистики з попередньої версії рахував час закриття від моменту оновлення.
+            cur.execute("DROP TRIGGER IF EXISTS replacement_stats_on_taken")
+
+        cur.execute("""
+            INSERT OR IGNORE INTO replacement_meta (replacement_id, created_at)
+            SELECT id, datetime('now') FROM replacements
+        """)
+
+        # replacement_meta.created_at зберігається як локальний час у тексті.
+        cur.execute("""
+            UPDATE replacements
+            SET created_at = (
+                SELECT CAST(strftime('%s', m.created_at, 'utc') AS INTEGER)
+                FROM replacement_meta m WHERE m.replacement_id = replacements.id
+            )
+            WHERE created_at IS NULL
+        """)
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_replacements_pending_created_at
+            ON replacements (created_at) WHERE status = 'pending'
+        """)
+
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'report_events'")
+        report_events_exists = cur.fetchone() is not None
+
+        # Журнал подій звіту: лише додавання, .xlsx будується з нього на вимогу.
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS report_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                replacement_id INTEGER,
+                report_month TEXT NOT NULL, -- РРРР-ММ
+                manager_username TEXT, request_date TEXT, position TEXT, shop TEXT,
+                worker_full_name TEXT, worker_id INTEGER, worker_username TEXT,
+                recorded_at TEXT NOT NULL
+            )
+        ''')
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_report_events_month ON report_events (report_month, id)")
+
+        if not report_events_exists:
+            cur.execute("""
+                INSERT INTO report_events (
+                    replacement_id, report_month, manager_username, request_date, position, shop,
+                    worker_full_name, worker_id, worker_username, recorded_at
+                )
+                SELECT r.id, substr(m.created_at, 1, 7), r.manager_username, r.request_date, r.position, r.shop,
+                       COALESCE(r.replacement_worker_full_name, ''), r.replacement_worker_id,
+                       COALESCE(r.replacement_worker_username, ''), m.created_at
+                FROM replacements r
+                JOIN replacement_meta m ON m.replacement_id = r.id
+                WHERE r.status IN ('taken', 'expired')
+                ORDER BY r.id
+            """)
+            if cur.rowcount > 0:
+                print(f"Виконано міграцію: до журналу звітів перенесено {cur.rowcount} завершених заявок.")
+
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'report_months'")
+        report_months_exists = cur.fetchone() is not None
+
+        # Підсумок журналу по місяцях (веде тригер): список доступних звітів і чи актуальний зібраний файл.
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS report_months (
+                report_month TEXT PRIMARY KEY, -- РРРР-ММ
+                events INTEGER NOT NULL,
+                last_event_id INTEGER NOT NULL,
+                built_event_id INTEGER -- остання подія, з якою зібрано .xlsx
+            )
+        ''')
+        if not report_months_exists:
+            cur.execute("""
+                INSERT INTO report_months (report_month, events, last_event_id)
+                SELECT report_month, COUNT(*), MAX(id) FROM report_events GROUP BY report_month
+            """)
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS report_months_on_event AFTER INSERT ON report_events
+            BEGIN
+                INSERT INTO report_months (report_month, events, last_event_id) VALUES (NEW.report_month, 1, NEW.id)
+                ON CONFLICT (report_month) DO UPDATE SET events = events + 1, last_event_id = NEW.id;
+            END
+        ''')
+
+        if taken_at_added:
+            # Для вже взятих заявок час взяття - момент запису в журнал звіту (recorded_at, локальний час).
+            # Події, перенесені міграцією журналу, мають recorded_at = час створення заявки: справжній
+            # час взяття невідомий, тож taken_at лишається NULL, а не дає нульовий час закриття.
+            cur.execute("""
+                UPDATE replacements
+                SET taken_at = (
+                    SELECT CAST(strftime('%s', MIN(e.recorded_at), 'utc') AS INTEGER)
+                    FROM report_events e
+                    LEFT JOIN replacement_meta m ON m.replacement_id = e.replacement_id
+                    WHERE e.replacement_id = replacements.id AND e.worker_id IS NOT NULL
+                      AND e.recorded_at IS NOT m.created_at
+                )
+                WHERE status = 'taken' AND taken_at IS NULL
+            """)
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_replacements_taken_at
+            ON replacements (taken_at) WHERE status = 'taken'
+        """)
+
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'replacement_stats'")
+        replacement_stats_exists = cur.fetchone() is not None
+
+        # Агрегати по магазину та посаді (ведуть тригери на replacements): статистика читається
+        # за O(магазини x посади), а не за всю історію. fill_samples - скільки взятих заявок мають відомий час закриття.
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS replacement_stats (
+                shop TEXT NOT NULL,
+                position TEXT NOT NULL,
+                created INTEGER NOT NULL DEFAULT 0,
+                taken INTEGER NOT NULL DEFAULT 0,
+                expired INTEGER NOT NULL DEFAULT 0,
+                fill_seconds_total INTEGER NOT NULL DEFAULT 0,
+                fill_samples INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (shop, position)
+            )
+        ''')
+        if not replacement_stats_exists or taken_at_added:
+            # Агрегати, зібрані до появи taken_at, могли містити нульові часи закриття - перебудовуємо.
+            cur.execute("DELETE FROM replacement_stats")
+            cur.execute("""
+                INSERT INTO replacement_stats (shop, position, created, taken, expired, fill_seconds_total, fill_samples)
+                SELECT COALESCE(shop, ''), COALESCE(position, ''), COUNT(*),
+                       SUM(status = 'taken'), SUM(status = 'expired'),
+                       COALESCE(SUM(CASE WHEN status = 'taken' THEN taken_at - created_at END), 0),
+                       SUM(status = 'taken' AND taken_at IS NOT NULL AND created_at IS NOT NULL)
+                FROM replacements
+                GROUP BY COALESCE(shop, ''), COALESCE(position, '')
+            """)
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS replacement_stats_on_insert AFTER INSERT ON replacements
+            BEGIN
+                INSERT INTO replacement_stats (shop, position, created) VALUES (COALESCE(NEW.shop, ''), COALESCE(NEW.position, ''), 1)
+                ON CONFLICT (shop, position) DO UPDATE SET created = created + 1;
+            END
+        ''')
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS replacement_stats_on_taken AFTER UPDATE OF status ON replacements
+            WHEN OLD.status = 'pending' AND NEW.status = 'taken'
+            BEGIN
+                UPDATE replacement_stats
+                SET taken = taken + 1,
+                    fill_seconds_total = fill_seconds_total + COALESCE(NEW.taken_at - NEW.created_at, 0),
+                    fill_samples = fill_samples + (NEW.taken_at IS NOT NULL AND NEW.created_at IS NOT NULL)
+                WHERE shop = COALESCE(NEW.shop, '') AND position = COALESCE(NEW.position, '');
+            END
+        ''')
+        cur.execute('''
+            CREATE TRIGGER IF NOT EXISTS replacement_stats_on_expired AFTER UPDATE OF status ON replacements
+            WHEN OLD.status = 'pending' AND NEW.status = 'expired'
+            BEGIN
+                UPDATE replacement_stats SET expired = expired + 1
+                WHERE shop = COALESCE(NEW.shop, '') AND position = COALESCE(NEW.position, '');
+            END
+        ''')
+
+        # file_id файлів, уже завантажених у Telegram: повторне надсилання не вимагає нового завантаження.
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS uploaded_files (
+                path TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                uploaded_at TEXT NOT NULL
+            )
+        ''')
 
 def add_user(db_path: str, user_id: int, role: str):
     """Додає нового користувача (лише за ID) або ігнорує, якщо він вже існує."""
     if role not in ['developer', 'manager']:
         print(f"Помилка: Невірна роль '{role}'.")
         return
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    try:
-        cur.execute("INSERT OR IGNORE INTO users (user_id, role) VALUES (?, ?)", (user_id, role))
-        con.commit()
-    finally:
-        con.close()
+    with connection(db_path) as con:
+        con.execute("INSERT OR IGNORE INTO users (user_id, role) VALUES (?, ?)", (user_id, role))
+    _users_cache.invalidate((db_path, user_id))
+    with _usernames_lock:
+        _known_usernames.pop((db_path, user_id), None)
 
 def update_user_username(db_path: str, user_id: int, username: str):
-    """Оновлює username для існуючого користувача."""
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("UPDATE users SET username = ? WHERE user_id = ?", (username, user_id))
-    con.commit()
-    con.close()
+    """
+    Запам'ятовує username існуючого користувача. Нічого не пише, якщо він не змінився
+    або користувача немає в базі; зміни записуються пачкою у flush_usernames.
+    """
+    key = (db_path, user_id)
+    with _usernames_lock:
+        if _known_usernames.get(key) == username:
+            return
+    user = get_user(db_path, user_id)
+    if user is None:
+        return
+    with _usernames_lock:
+        _known_usernames[key] = username
+        if user['username'] != username:
+            _pending_usernames.setdefault(db_path, {})[user_id] = username
+        else:
+            # Ім'я повернулося до збереженого ще до запису: відкладена зміна вже не потрібна.
+            _pending_usernames.get(db_path, {}).pop(user_id, None)
+
+def flush_usernames(db_path: str) -> int:
+    """Записує накопичені зміни username однією транзакцією. Повертає кількість записаних змін."""
+    with _usernames_lock:
+        pending = _pending_usernames.pop(db_path, {})
+    if not pending:
+        return 0
+    try:
+        with connection(db_path) as con:
+            con.executemany(
+                "UPDATE users SET username = ? WHERE user_id = ? AND username IS NOT ?",
+                [(username, user_id, username) for user_id, username in pending.items()]
+            )
+    except Exception:
+        with _usernames_lock:
+            queued = _pending_usernames.setdefault(db_path, {})
+            for user_id, username in pending.items():
+                queued.setdefault(user_id, username)
+        raise
+    for user_id in pending:
+        _users_cache.invalidate((db_path, user_id))
+    return len(pending)
 
 def get_user(db_path: str, user_id: int):
     """Отримує дані користувача за його ID."""
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("SELECT user_id, username, role FROM users WHERE user_id = ?", (user_id,))
-    user = cur.fetchone()
-    con.close()
+    user = _users_cache.get((db_path, user_id))
+    if user is MISSING:
+        with connection(db_path) as con:
+            user = con.execute("SELECT user_id, username, role FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        _users_cache.set((db_path, user_id), user)
     if user:
         return {"user_id": user[0], "username": user[1], "role": user[2]}
     return None
 
 def delete_user(db_path: str, user_id: int):
     """Видаляє користувача з бази даних за його ID."""
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
-    con.commit()
-    con.close()
+    with connection(db_path) as con:
+        con.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+    _users_cache.invalidate((db_path, user_id))
+    with _usernames_lock:
+        _known_usernames.pop((db_path, user_id), None)
+        _pending_usernames.get(db_path, {}).pop(user_id, None)
     print(f"Користувача з ID {user_id} видалено.")
 
 def get_user_by_role(db_path: str, role: str) -> list:
     """Повертає список користувачів з вказаною роллю."""
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("SELECT user_id, username FROM users WHERE role = ?", (role,))
-    users = cur.fetchall()
-    con.close()
+    with connection(db_path) as con:
+        users = con.execute("SELECT user_id, username FROM users WHERE role = ?", (role,)).fetchall()
     return [{"user_id": user[0], "username": user[1] or f"ID: {user[0]}"} for user in users]
 
 def add_replacement(db_path: str, manager_id: int, manager_username: str, request_date: str, position: str, shop: str) -> int:
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("PRAGMA foreign_keys = ON")
-    cur.execute("INSERT INTO replacements (manager_id, manager_username, request_date, position, shop) VALUES (?, ?, ?, ?, ?)", (manager_id, manager_username, request_date, position, shop))
-    replacement_id = cur.lastrowid
-    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    cur.execute("INSERT OR REPLACE INTO replacement_meta (replacement_id, created_at) VALUES (?, ?)", (replacement_id, created_at))
-    con.commit()
-    con.close()
+    now = time.time()
+    with connection(db_path) as con:
+        cur = con.cursor()
+        cur.execute("INSERT INTO replacements (manager_id, manager_username, request_date, position, shop, created_at) VALUES (?, ?, ?, ?, ?, ?)", (manager_id, manager_username, request_date, position, shop, int(now)))
+        replacement_id = cur.lastrowid
+        created_at = datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S')
+        cur.execute("INSERT OR REPLACE INTO replacement_meta (replacement_id, created_at) VALUES (?, ?)", (replacement_id, created_at))
     return replacement_id
 
 def update_replacement_message_id(db_path: str, replacement_id: int, message_id: int, chat_id: int):
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("UPDATE replacements SET message_id = ?, chat_id = ? WHERE id = ?", (message_id, chat_id, replacement_id))
-    con.commit()
-    con.close()
+    with connection(db_path) as con:
+        con.execute("UPDATE replacements SET message_id = ?, chat_id = ? WHERE id = ?", (message_id, chat_id, replacement_id))
 
 def get_replacement(db_path: str, replacement_id: int):
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("SELECT id, status FROM replacements WHERE id = ?", (replacement_id,))
-    data = cur.fetchone()
-    con.close()
+    with connection(db_path) as con:
+        data = con.execute("SELECT id, status FROM replacements WHERE id = ?", (replacement_id,)).fetchone()
     if data: return {"id": data[0], "status": data[1]}
     return None
 
+_DETAILS_COLUMNS = """
+    id, manager_username, request_date, position, shop, 
+    replacement_worker_id, replacement_worker_full_name, replacement_worker_username 
+"""
+
+def _details_from_row(data) -> dict:
+    return {
+        "id": data[0], "manager_username": data[1], "request_date": data[2],
+        "position": data[3], "shop": data[4], "replacement_worker_id": data[5],
+        "replacement_worker_full_name": data[6], "replacement_worker_username": data[7]
+    }
+
 def get_full_replacement_details(db_path: str, replacement_id: int) -> Optional[dict]:
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("""
-        SELECT id, manager_username, request_date, position, shop, 
-               replacement_worker_id, replacement_worker_full_name, replacement_worker_username 
-        FROM replacements WHERE id = ?
-    """, (replacement_id,))
-    data = cur.fetchone()
-    con.close()
+    with connection(db_path) as con:
+        data = con.execute(f"SELECT {_DETAILS_COLUMNS} FROM replacements WHERE id = ?", (replacement_id,)).fetchone()
     if data:
-        return {
-            "id": data[0], "manager_username": data[1], "request_date": data[2],
-            "position": data[3], "shop": data[4], "replacement_worker_id": data[5],
-            "replacement_worker_full_name": data[6], "replacement_worker_username": data[7]
-        }
+        return _details_from_row(data)
     return None
 
-def take_replacement(db_path: str, replacement_id: int, worker_id: int, worker_full_name: str, worker_username: Optional[str]):
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("""
-        UPDATE replacements 
-        SET status = 'taken', 
-            replacement_worker_id = ?, 
-            replacement_worker_full_name = ?, 
-            replacement_worker_username = ? 
-        WHERE id = ?
-    """, (worker_id, worker_full_name, worker_username, replacement_id))
-    con.commit()
-    con.close()
+def take_replacement(db_path: str, replacement_id: int, worker_id: int, worker_full_name: str, worker_username: Optional[str]) -> Optional[dict]:
+    """
+    Атомарно закріплює заявку за працівником, лише якщо вона ще в статусі 'pending'.
+    Повертає повні деталі заявки, якщо заміну взяв саме цей виклик, інакше None.
+    """
+    with connection(db_path) as con:
+        cur = con.execute("""
+            UPDATE replacements 
+            SET status = 'taken', 
+                replacement_worker_id = ?, 
+                replacement_worker_full_name = ?, 
+                replacement_worker_username = ?,
+                taken_at = ?
+            WHERE id = ? AND status = 'pending'
+        """, (worker_id, worker_full_name, worker_username, int(time.time()), replacement_id))
+        if cur.rowcount != 1:
+            return None
+        # Читання в тій самій транзакції: рядок уже заблоковано нашим UPDATE.
+        data = con.execute(f"SELECT {_DETAILS_COLUMNS} FROM replacements WHERE id = ?", (replacement_id,)).fetchone()
+    return _details_from_row(data)
 
 def expire_replacement(db_path: str, replacement_id: int):
     """Позначає заявку як прострочену."""
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("UPDATE replacements SET status = 'expired' WHERE id = ?", (replacement_id,))
-    con.commit()
-    con.close()
-
-def get_pending_replacements_older_than(db_path: str, cutoff_timestamp: str):
-    """Повертає всі pending-заявки, створені раніше за cutoff_timestamp."""
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("""
-        SELECT r.id, r.manager_username, r.request_date, r.position, r.shop, r.message_id, r.chat_id
-        FROM replacements r
-        JOIN replacement_meta m ON r.id = m.replacement_id
-        WHERE r.status = 'pending' AND datetime(m.created_at) <= datetime(?)
-    """, (cutoff_timestamp,))
-    rows = cur.fetchall()
-    con.close()
+    with connection(db_path) as con:
+        con.execute("UPDATE replacements SET status = 'expired' WHERE id = ?", (replacement_id,))
+
+def get_pending_replacements_older_than(db_path: str, cutoff_ts: int):
+    """Повертає всі pending-заявки, створені не пізніше за cutoff_ts (Unix-час)."""
+    with connection(db_path) as con:
+        rows = con.execute("""
+            SELECT id, manager_username, request_date, position, shop, message_id, chat_id
+            FROM replacements
+            WHERE status = 'pending' AND created_at <= ?
+        """, (cutoff_ts,)).fetchall()
     return [
         {
             "id": row[0],
@@ -203,54 +487,356 @@ def get_pending_replacements_older_than(db_path: str, cutoff_timestamp: str):
         for row in rows
     ]
 
-def init_employees_db(db_path: str):
+def get_oldest_pending_created_at(db_path: str) -> Optional[int]:
+    """Повертає час створення (Unix) найстарішої pending-заявки або None, якщо таких немає."""
+    with connection(db_path) as con:
+        row = con.execute("SELECT MIN(created_at) FROM replacements WHERE status = 'pending'").fetchone()
+    return row[0]
+
+def expire_pending_replacements_older_than(db_path: str, cutoff_ts: int) -> list:
+    """
+    В одній транзакції позначає простроченими всі pending-заявки, створені не пізніше за cutoff_ts,
+    і повертає їхні повні деталі разом з message_id та chat_id повідомлення в групі.
+    """
+    with connection(db_path) as con:
+        # IMMEDIATE: між вибіркою та оновленням ніхто не встигне взяти заявку.
+        con.execute("BEGIN IMMEDIATE")
+        rows = con.execute(f"""
+            SELECT {_DETAILS_COLUMNS}, message_id, chat_id
+            FROM replacements
+            WHERE status = 'pending' AND created_at <= ?
+        """, (cutoff_ts,)).fetchall()
+        if rows:
+            con.execute("UPDATE replacements SET status = 'expired' WHERE status = 'pending' AND created_at <= ?", (cutoff_ts,))
+    expired = []
+    for row in rows:
+        details = _details_from_row(row)
+        details['message_id'] = row[8]
+        details['chat_id'] = row[9]
+        expired.append(details)
+    return expired
+
+def add_report_events(db_path: str, replacements: list):
+    """Додає завершені заявки (взяті або прострочені) в журнал звіту однією транзакцією."""
+    if not replacements:
+        return
+    now = datetime.now()
+    recorded_at = now.strftime('%Y-%m-%d %H:%M:%S')
+    report_month = now.strftime('%Y-%m')
+    with connection(db_path) as con:
+        con.executemany("""
+            INSERT INTO report_events (
+                replacement_id, report_month, manager_username, request_date, position, shop,
+                worker_full_name, worker_id, worker_username, recorded_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (
+                data.get('id'), report_month, data.get('manager_username'), data.get('request_date'),
+                data.get('position'), data.get('shop'), data.get('replacement_worker_full_name'),
+                data.get('replacement_worker_id'), data.get('replacement_worker_username'), recorded_at
+            )
+            for data in replacements
+        ])
+
+def get_report_month_summary(db_path: str, report_month: str) -> Optional[dict]:
+    """Повертає підсумок місяця РРРР-ММ (кількість подій, остання подія, з якою зібрано файл) або None."""
+    with connection(db_path) as con:
+        row = con.execute(
+            "SELECT report_month, events, last_event_id, built_event_id FROM report_months WHERE report_month = ?",
+            (report_month,)
+        ).fetchone()
+    if row:
+        return {"report_month": row[0], "events": row[1], "last_event_id": row[2], "built_event_id": row[3]}
+    return None
+
+def get_report_months(db_path: str, limit: int = 24) -> list:
+    """Повертає місяці, за які є звіти, від найновішого, з кількістю записів."""
+    with connection(db_path) as con:
+        rows = con.execute(
+            "SELECT report_month, events FROM report_months ORDER BY report_month DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [{"report_month": row[0], "events": row[1]} for row in rows]
+
+def mark_report_built(db_path: str, report_month: str, event_id: int):
+    """Запам'ятовує, що файл звіту за місяць зібрано з подіями до event_id включно."""
+    with connection(db_path) as con:
+        con.execute("UPDATE report_months SET built_event_id = ? WHERE report_month = ?", (event_id, report_month))
+
+def iter_report_events(db_path: str, report_month: str) -> Iterator[tuple]:
+    """Ітерує рядки звіту за місяць РРРР-ММ у порядку запису, не завантажуючи їх усі в пам'ять."""
+    with connection(db_path) as con:
+        cursor = con.execute("""
+            SELECT replacement_id, manager_username, request_date, position, shop,
+                   worker_full_name, worker_id, recorded_at
+            FROM report_events
+            WHERE report_month = ?
+            ORDER BY id
+        """, (report_month,))
+        yield from cursor
+
+def get_uploaded_file_id(db_path: str, path: str, sha256: str) -> Optional[str]:
+    """Повертає file_id раніше завантаженого файлу, якщо його вміст не змінився."""
+    with connection(db_path) as con:
+        row = con.execute("SELECT file_id FROM uploaded_files WHERE path = ? AND sha256 = ?", (path, sha256)).fetchone()
+    return row[0] if row else None
+
+def save_uploaded_file_id(db_path: str, path: str, sha256: str, file_id: str):
+    with connection(db_path) as con:
+        con.execute(
+            "INSERT OR REPLACE INTO uploaded_files (path, sha256, file_id, uploaded_at) VALUES (?, ?, ?, ?)",
+            (path, sha256, file_id, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        )
+
+def forget_uploaded_file(db_path: str, path: str):
+    with connection(db_path) as con:
+        con.execute("DELETE FROM uploaded_files WHERE path = ?", (path,))
+
+def get_replacement_stats(db_path: str, group_by: str) -> list:
+    """
+    Повертає агреговану статистику заявок, згруповану за 'shop' або 'position'
+    (з таблиці replacement_stats, без перегляду історії заявок), від найбільшої кількості заявок.
+    """
+    if group_by not in ('shop', 'position'):
+        raise ValueError(f"Непідтримуване групування: {group_by}")
+    with connection(db_path) as con:
+        rows = con.execute(f"""
+            SELECT {group_by}, SUM(created), SUM(taken), SUM(expired), SUM(fill_seconds_total), SUM(fill_samples)
+            FROM replacement_stats
+            GROUP BY {group_by}
+            ORDER BY SUM(created) DESC
+        """).fetchall()
+    return [
+        {
+            "name": row[0],
+            "created": row[1],
+            "taken": row[2],
+            "expired": row[3],
+            "fill_seconds_total": row[4],
+            "fill_samples": row[5],
+        }
+        for row in rows
+    ]
+
+def _percentile(sorted_values: list, percent: float) -> int:
+    """Перцентиль за методом найближчого рангу для відсортованого непорожнього списку."""
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def get_fill_time_percentiles(db_path: str, since_ts: Optional[int] = None, until_ts: Optional[int] = None) -> dict:
+    """
+    Рахує p50/p90/p99 часу закриття (taken_at - created_at, у секундах) для заявок,
+    взятих у проміжку [since_ts, until_ts). Повертає {"city": {...}, "shops": {магазин: {...}}},
+    де кожне значення - {"count", "p50", "p90", "p99"}; магазини без взятих заявок пропускаються.
+    """
+    conditions = ["status = 'taken'", "taken_at IS NOT NULL", "created_at IS NOT NULL"]
+    params = []
+    if since_ts is not None:
+        conditions.append("taken_at >= ?")
+        params.append(since_ts)
+    if until_ts is not None:
+        conditions.append("taken_at < ?")
+        params.append(until_ts)
+    with connection(db_path) as con:
+        rows = con.execute(
+            f"SELECT COALESCE(shop, ''), taken_at - created_at FROM replacements WHERE {' AND '.join(conditions)}",
+            params
+        ).fetchall()
+
+    def summarize(values: list) -> dict:
+        values.sort()
+        return {"count": len(values), "p50": _percentile(values, 50), "p90": _percentile(values, 90), "p99": _percentile(values, 99)}
+
+    by_shop: Dict[str, list] = {}
+    for shop, seconds in rows:
+        by_shop.setdefault(shop, []).append(max(0, seconds))
+    return {
+        "city": summarize([seconds for values in by_shop.values() for seconds in values]) if rows else None,
+        "shops": {shop: summarize(values) for shop, values in sorted(by_shop.items())},
+    }
+
+def init_employees_db(db_path: str, storage_profile: Optional[dict] = None):
     """Ініціалізує базу даних працівників."""
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS employees (
-            user_id INTEGER PRIMARY KEY,
-            full_name TEXT NOT NULL
-        )
-    ''')
-    con.commit()
-    con.close()
+    configure_storage(db_path, storage_profile)
+    with connection(db_path) as con:
+        con.execute('''
+            CREATE TABLE IF NOT EXISTS employees (
+                user_id INTEGER PRIMARY KEY,
+                full_name TEXT NOT NULL
+            )
+        ''')
+
+        con.execute("CREATE INDEX IF NOT EXISTS idx_employees_full_name ON employees (full_name, user_id)")
+
+        # Лічильник змін таблиці employees (ведуть тригери): синхронізація списку пропускається,
+        # лише якщо і список, і таблиця не змінилися з попередньої синхронізації.
+        con.execute('''
+            CREATE TABLE IF NOT EXISTS employees_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                changes INTEGER NOT NULL
+            )
+        ''')
+        con.execute("INSERT OR IGNORE INTO employees_state (id, changes) VALUES (1, 0)")
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            con.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS employees_changes_{event.lower()} AFTER {event} ON employees
+                BEGIN
+                    UPDATE employees_state SET changes = changes + 1 WHERE id = 1;
+                END
+            ''')
+
+        con.execute('''
+            CREATE TABLE IF NOT EXISTS roster_sync (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                roster_sha256 TEXT NOT NULL,
+                employees_changes INTEGER NOT NULL, -- employees_state.changes після синхронізації
+                added INTEGER NOT NULL, updated INTEGER NOT NULL, removed INTEGER NOT NULL,
+                source TEXT,
+                synced_at TEXT NOT NULL
+            )
+        ''')
 
 def add_employee(db_path: str, user_id: int, full_name: str):
     """Додає нового працівника."""
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("INSERT OR REPLACE INTO employees (user_id, full_name) VALUES (?, ?)", (user_id, full_name))
-    con.commit()
-    con.close()
+    with connection(db_path) as con:
+        con.execute("INSERT OR REPLACE INTO employees (user_id, full_name) VALUES (?, ?)", (user_id, full_name))
+    _employees_cache.invalidate((db_path, user_id))
 
 def delete_employee(db_path: str, user_id: int):
     """Видаляє працівника за його ID."""
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("DELETE FROM employees WHERE user_id = ?", (user_id,))
-    con.commit()
-    con.close()
+    with connection(db_path) as con:
+        con.execute("DELETE FROM employees WHERE user_id = ?", (user_id,))
+    _employees_cache.invalidate((db_path, user_id))
+
+def _apply_employees(con: sqlite3.Connection, incoming: Dict[int, str], prune: bool) -> dict:
+    """Записує різницю між incoming і таблицею employees в межах відкритої транзакції."""
+    existing = dict(con.execute("SELECT user_id, full_name FROM employees"))
+    added = [user_id for user_id in incoming if user_id not in existing]
+    updated = [user_id for user_id in incoming if user_id in existing and existing[user_id] != incoming[user_id]]
+    removed = [user_id for user_id in existing if user_id not in incoming] if prune else []
+    con.executemany(
+        "INSERT OR REPLACE INTO employees (user_id, full_name) VALUES (?, ?)",
+        [(user_id, incoming[user_id]) for user_id in added + updated]
+    )
+    con.executemany("DELETE FROM employees WHERE user_id = ?", [(user_id,) for user_id in removed])
+    return {
+        "added": added,
+        "updated": updated,
+        "unchanged": len(incoming) - len(added) - len(updated),
+        "removed": removed,
+    }
+
+def _invalidate_employees(db_path: str, summary: dict):
+    for user_id in summary["added"] + summary["updated"] + summary["removed"]:
+        _employees_cache.invalidate((db_path, user_id))
+
+def upsert_employees(db_path: str, rows, prune: bool = False) -> dict:
+    """
+    Додає або оновлює працівників зі списку пар (user_id, full_name) однією транзакцією.
+    Якщо prune=True, працівники, яких немає в списку, видаляються.
+    Повертає підсумок: ID доданих, оновлених і видалених працівників та кількість незмінених.
+    """
+    incoming = {int(user_id): full_name for user_id, full_name in rows}
+    with connection(db_path) as con:
+        con.execute("BEGIN IMMEDIATE")
+        summary = _apply_employees(con, incoming, prune)
+    _invalidate_employees(db_path, summary)
+    return summary
+
+def roster_sha256(incoming: Dict[int, str]) -> str:
+    """Хеш списку працівників, що не залежить від порядку рядків."""
+    digest = hashlib.sha256()
+    for user_id in sorted(incoming):
+        digest.update(f"{user_id}\t{incoming[user_id]}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def sync_employees(db_path: str, rows, source: Optional[str] = None) -> dict:
+    """
+    Приводить таблицю employees у відповідність до повного списку (user_id, full_name):
+    додає нових, оновлює змінених і видаляє відсутніх працівників однією транзакцією
+    та записує нову версію синхронізації. Якщо хеш списку збігається з попередньою синхронізацією
+    і таблиця відтоді не змінювалася, нічого не записує.
+    Повертає підсумок як upsert_employees, а також "version" і "skipped".
+    """
+    incoming = {int(user_id): full_name for user_id, full_name in rows}
+    sha256 = roster_sha256(incoming)
+    with connection(db_path) as con:
+        con.execute("BEGIN IMMEDIATE")
+        changes = con.execute("SELECT changes FROM employees_state WHERE id = 1").fetchone()[0]
+        last = con.execute(
+            "SELECT version, roster_sha256, employees_changes FROM roster_sync ORDER BY version DESC LIMIT 1"
+        ).fetchone()
+        if last and last[1] == sha256 and last[2] == changes:
+            return {"added": [], "updated": [], "unchanged": len(incoming), "removed": [], "version": last[0], "skipped": True}
+
+        summary = _apply_employees(con, incoming, prune=True)
+        changes = con.execute("SELECT changes FROM employees_state WHERE id = 1").fetchone()[0]
+        cur = con.execute("""
+            INSERT INTO roster_sync (roster_sha256, employees_changes, added, updated, removed, source, synced_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            sha256, changes, len(summary["added"]), len(summary["updated"]), len(summary["removed"]),
+            source, datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        ))
+        summary["version"] = cur.lastrowid
+        summary["skipped"] = False
+    _invalidate_employees(db_path, summary)
+    return summary
 
 def get_employee(db_path: str, user_id: int) -> Optional[dict]:
-    """Отримує дані працівника за його ID."""
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("SELECT user_id, full_name FROM employees WHERE user_id = ?", (user_id,))
-    employee = cur.fetchone()
-    con.close()
+    """
+    Отримує дані працівника за його ID. Кеш перевіряється за лічильником змін employees_state
+    (один рядок), тож зміни з інших процесів видно одразу, а не після закінчення TTL.
+    """
+    with connection(db_path) as con:
+        changes = con.execute("SELECT changes FROM employees_state WHERE id = 1").fetchone()[0]
+    if _employees_versions.get(db_path) != changes:
+        _employees_cache.invalidate_where(lambda key: key[0] == db_path)
+        _employees_versions[db_path] = changes
+    employee = _employees_cache.get((db_path, user_id))
+    if employee is MISSING:
+        with connection(db_path) as con:
+            employee = con.execute("SELECT user_id, full_name FROM employees WHERE user_id = ?", (user_id,)).fetchone()
+        _employees_cache.set((db_path, user_id), employee)
     if employee:
         return {"user_id": employee[0], "full_name": employee[1]}
     return None
 
+def get_employees_page(
+    db_path: str,
+    cursor: Optional[Tuple[str, int]] = None,
+    backward: bool = False,
+    inclusive: bool = False,
+    limit: int = 10,
+) -> Tuple[list, bool]:
+    """
+    Повертає сторінку працівників, відсортованих за (full_name, user_id), починаючи від ключа cursor
+    (вперед або, якщо backward=True, назад; inclusive=True - разом із самим ключем), за індексом
+    idx_employees_full_name без OFFSET. Другим значенням повертає, чи є ще записи в цьому напрямку.
+    """
+    if cursor is None:
+        condition, params = "", ()
+    else:
+        operator = ('<' if backward else '>') + ('=' if inclusive else '')
+        condition, params = f"WHERE (full_name, user_id) {operator} (?, ?)", tuple(cursor)
+    order = "DESC" if backward else "ASC"
+    with connection(db_path) as con:
+        rows = con.execute(f"""
+            SELECT user_id, full_name FROM employees
+            {condition}
+            ORDER BY full_name {order}, user_id {order}
+            LIMIT ?
+        """, params + (limit + 1,)).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+    return [{"user_id": row[0], "full_name": row[1]} for row in rows], more
+
 def get_all_employees(db_path: str) -> list:
     """Повертає список усіх працівників."""
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("SELECT user_id, full_name FROM employees ORDER BY full_name")
-    employees = cur.fetchall()
-    con.close()
+    with connection(db_path) as con:
+        employees = con.execute("SELECT user_id, full_name FROM employees ORDER BY full_name").fetchall()
     return [{"user_id": emp[0], "full_name": emp[1]} for emp in employees]
 
 
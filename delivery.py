@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+
+logger = logging.getLogger(__name__)
+
+# Ліміти Telegram Bot API: ~30 повідомлень/с на бота, ~1/с в особистий чат, ~20/хв у групу.
+GLOBAL_RATE = 30.0
+PRIVATE_CHAT_RATE = 1.0
+GROUP_CHAT_RATE = 20 / 60
+GROUP_CHAT_BURST = 3
+
+# Від якої глибини черги варто попереджати в лозі.
+DEPTH_WARNING = 50
+
+
+def is_retryable(error: Exception) -> bool:
+    """Чи варто повторити виклик: мережеві збої та тайм-аути - так, помилки запиту (BadRequest) - ні."""
+    return isinstance(error, RetryAfter) or (isinstance(error, NetworkError) and not isinstance(error, BadRequest))
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Експоненційна затримка з повним джитером для спроби номер attempt (з нуля)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Запобіжник для одного бота: після failure_threshold мережевих збоїв поспіль виклики
+    призупиняються на reset_timeout секунд, потім пропускається одна пробна спроба.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def retry_in(self) -> float:
+        """Скільки секунд лишилося до пробної спроби (0, якщо виклики дозволені)."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Напіввідкритий стан: пропускаємо одну спробу, наступні чекають на її результат.
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Зв'язок з Telegram API відновлено.")
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Telegram API недоступний ({self._failures} збоїв поспіль). Призупиняю надсилання на {self.reset_timeout} с.")
+                self._opened_at = time.monotonic()
+
+
+class TokenBucket:
+    """Відро токенів: rate токенів на секунду, не більше capacity про запас."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Скільки секунд чекати до появи наступного токена."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class _Outgoing:
+    __slots__ = ('chat_id', 'method', 'args', 'kwargs', 'on_success', 'description', 'future', 'attempt', 'not_before')
+
+    def __init__(self, chat_id, method, args, kwargs, on_success, description):
+        self.chat_id = chat_id
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.on_success = on_success
+        self.description = description
+        self.future = Future()
+        self.attempt = 0
+        self.not_before = 0.0
+
+
+class OutboundQueue(threading.Thread):
+    """
+    Черга вихідних викликів Telegram API одного бота. Виклики виконуються в окремому потоці
+    з обмеженням швидкості (відро токенів на бота та на кожен chat_id), з дотриманням RetryAfter
+    і повторами мережевих збоїв з експоненційною затримкою під наглядом запобіжника.
+    Порядок повідомлень у межах одного чату зберігається.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, name: str = "outbound", max_attempts: int = 8):
+        super().__init__(name=name, daemon=True)
+        self.breaker = breaker
+        self.max_attempts = max_attempts
+        self._chats: Dict[int, deque] = {}
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._chat_paused_until: Dict[int, float] = {}
+        self._global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self._cond = threading.Condition()
+        self._stop_deadline: Optional[float] = None
+        self._last_depth_warning = 0.0
+
+    def submit(
+        self,
+        chat_id: int,
+        method: Callable[..., Any],
+        /,
+        *args,
+        on_success: Optional[Callable[[Any], None]] = None,
+        description: str = "",
+        **kwargs,
+    ) -> Future:
+        """
+        Ставить виклик method(*args, **kwargs) для чату chat_id у чергу. Повертає Future з результатом.
+        chat_id і method - лише позиційні, тож kwargs можуть містити власний chat_id виклику.
+        """
+        item = _Outgoing(chat_id, method, args, kwargs, on_success, description)
+        with self._cond:
+            self._chats.setdefault(chat_id, deque()).append(item)
+            depth = self._depth()
+            self._cond.notify()
+        now = time.monotonic()
+        if depth >= DEPTH_WARNING and now - self._last_depth_warning >= 60:
+            self._last_depth_warning = now
+            logger.warning(f"Черга надсилання {self.name}: {depth} повідомлень очікують.")
+        return item.future
+
+    def depth(self) -> int:
+        """Кількість викликів, що очікують у черзі."""
+        with self._cond:
+            return self._depth()
+
+    def depth_by_chat(self) -> Dict[int, int]:
+        with self._cond:
+            return {chat_id: len(items) for chat_id, items in self._chats.items()}
+
+    def stop(self, timeout: float = 10):
+        """Намагається дописати чергу протягом timeout секунд і зупиняє потік."""
+        with self._cond:
+            self._stop_deadline = time.monotonic() + timeout
+            self._cond.notify()
+        self.join(timeout + 1)
+
+    def _depth(self) -> int:
+        return sum(len(items) for items in self._chats.values())
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if chat_id < 0:
+                bucket = TokenBucket(GROUP_CHAT_RATE, GROUP_CHAT_BURST)
+            else:
+                bucket = TokenBucket(PRIVATE_CHAT_RATE, 1)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _next_ready(self, now: float):
+        """Повертає (момент готовності, chat_id) для найближчого виклику, який можна виконати."""
+        best = None
+        for chat_id, items in self._chats.items():
+            ready_at = max(
+                items[0].not_before,
+                self._chat_paused_until.get(chat_id, 0.0),
+                now + self._chat_bucket(chat_id).wait_time(now),
+            )
+            if best is None or ready_at < best[0]:
+                best = (ready_at, chat_id)
+        ready_at, chat_id = best
+        ready_at = max(ready_at, now + self._global_bucket.wait_time(now), now + self.breaker.retry_in())
+        return ready_at, chat_id
+
+    def _take_next(self) -> Optional[_Outgoing]:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._stop_deadline is not None and (not self._chats or now >= self._stop_deadline):
+                    self._abandon_remaining()
+                    return None
+                if not self._chats:
+                    self._cond.wait()
+                    continue
+                ready_at, chat_id = self._next_ready(now)
+                if ready_at <= now and self.breaker.allow_request():
+                    break
+                wait_until = max(ready_at, now + 0.1)
+                if self._stop_deadline is not None:
+                    wait_until = min(wait_until, self._stop_deadline)
+                self._cond.wait(wait_until - now)
+
+            items = self._chats[chat_id]
+            item = items.popleft()
+            if not items:
+                del self._chats[chat_id]
+            self._chat_bucket(chat_id).consume(now)
+            self._global_bucket.consume(now)
+            return item
+
+    def _requeue(self, item: _Outgoing):
+        with self._cond:
+            self._chats.setdefault(item.chat_id, deque()).appendleft(item)
+            self._cond.notify()
+
+    def _abandon_remaining(self):
+        remaining = [item for items in self._chats.values() for item in items]
+        self._chats.clear()
+        if remaining:
+            logger.warning(f"Черга надсилання {self.name} зупинена, не надіслано: {len(remaining)}.")
+        for item in remaining:
+            item.future.set_exception(RuntimeError("Черга надсилання зупинена"))
+
+    def _execute(self, item: _Outgoing):
+        try:
+            result = item.method(*item.args, **item.kwargs)
+        except Exception as e:
+            if isinstance(e, RetryAfter):
+                logger.info(f"'{item.description}': Telegram просить зачекати {e.retry_after} с.")
+                with self._cond:
+                    self._chat_paused_until[item.chat_id] = time.monotonic() + e.retry_after
+                self._requeue(item)
+                return
+            if is_retryable(e):
+                self.breaker.record_failure()
+                if item.attempt + 1 < self.max_attempts:
+                    item.attempt += 1
+                    delay = backoff_delay(item.attempt)
+                    item.not_before = time.monotonic() + delay
+                    logger.warning(f"'{item.description}' не виконано ({e}). Повтор через {delay:.1f} с.")
+                    self._requeue(item)
+                    return
+            logger.warning(f"Не вдалося виконати '{item.description}' (спроба {item.attempt + 1}): {e}")
+            item.future.set_exception(e)
+            return
+
+        self.breaker.record_success()
+        if item.on_success:
+            try:
+                item.on_success(result)
+            except Exception as e:
+                logger.error(f"Помилка в обробнику успіху для '{item.description}': {e}")
+        item.future.set_result(result)
+
+    def run(self):
+        while True:
+            item = self._take_next()
+            if item is None:
+                break
+            self._execute(item)
+        logger.info(f"Черга надсилання {self.name} зупинена.")
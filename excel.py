@@ -1,9 +1,14 @@
 
 import os
 import logging
-from datetime import datetime
-import openpyxl
-from openpyxl.styles import Font, Alignment, Border, Side
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+import database as db
+
+# openpyxl імпортується всередині функцій: він потрібен лише під час збирання звіту,
+# а його імпорт - найдовша частина холодного старту бота.
 
 MONTHS_UA = {
     1: 'Січень', 2: 'Лютий', 3: 'Березень', 4: 'Квітень', 5: 'Травень', 6: 'Червень',
@@ -15,71 +20,120 @@ MONTHS_UA_ADJECTIVE = {
     7: 'Липневий', 8: 'Серпневий', 9: 'Вересневий', 10: 'Жовтневий', 11: 'Листопадовий', 12: 'Грудневий'
 }
 
+REPORT_HEADERS = [
+    "ID Заявки", "Керівник", "Дата Заміни", "Посада",
+    "Магазин", "Хто Замінив", "Username Заміни", "Дата Створення Заявки"
+]
+
+COLUMN_WIDTHS = {'A': 10, 'B': 20, 'C': 15, 'D': 15, 'E': 25, 'F': 20, 'G': 20, 'H': 20}
+
+FILL_TIME_HEADERS = ["Магазин", "Взято заявок", "p50, хв", "p90, хв", "p99, хв"]
+
+FILL_TIME_COLUMN_WIDTHS = {'A': 35, 'B': 15, 'C': 12, 'D': 12, 'E': 12}
+
+_build_lock = threading.Lock()
+
+def get_report_month(for_date: datetime = None) -> str:
+    """Повертає ключ місяця звіту у форматі РРРР-ММ."""
+    if for_date is None:
+        for_date = datetime.now()
+    return for_date.strftime('%Y-%m')
+
 def get_report_filename(reports_dir: str, for_date: datetime = None) -> str:
     """Генерує назву файлу звіту для місяця, що відповідає даті for_date."""
     if for_date is None:
         for_date = datetime.now()
     
     month_name_adj = MONTHS_UA_ADJECTIVE[for_date.month]
-    filename = f"{month_name_adj}_звіт_заміни.xlsx"
+    filename = f"{month_name_adj}_{for_date.year}_звіт_заміни.xlsx"
     
     os.makedirs(reports_dir, exist_ok=True)
     return os.path.join(reports_dir, filename)
 
 def style_header_cell(cell):
     """Стилізує клітинку заголовка."""
+    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+
     cell.font = Font(bold=True, color="FFFFFF")
     cell.alignment = Alignment(horizontal='center', vertical='center')
-    cell.fill = openpyxl.styles.PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+    cell.fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
     thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
     cell.border = thin_border
 
-def record_replacement_to_excel(reports_dir: str, replacement_data: dict):
-    """Записує дані про заміну в Excel-файл."""
-    filepath = get_report_filename(reports_dir)
-    headers = [
-        "ID Заявки", "Керівник", "Дата Заміни", "Посада",
-        "Магазин", "Хто Замінив", "Username Заміни", "Дата Створення Заявки"
-    ]
-    try:
-        if not os.path.exists(filepath):
-            workbook = openpyxl.Workbook()
-            sheet = workbook.active
-            sheet.title = "Звіт по замінах"
-            sheet.append(headers)
-            for cell in sheet[1]:
-                style_header_cell(cell)
-            sheet.column_dimensions['A'].width = 10
-            sheet.column_dimensions['B'].width = 20
-            sheet.column_dimensions['C'].width = 15
-            sheet.column_dimensions['D'].width = 15
-            sheet.column_dimensions['E'].width = 25
-            sheet.column_dimensions['F'].width = 20
-            sheet.column_dimensions['G'].width = 20
-            sheet.column_dimensions['H'].width = 20
-        else:
-            workbook = openpyxl.load_workbook(filepath)
-            sheet = workbook.active
-
-        worker_id = replacement_data.get('replacement_worker_id')
-
-        row_data = [
-            replacement_data.get('id'),
-            replacement_data.get('manager_username'),
-            replacement_data.get('request_date'),
-            replacement_data.get('position'),
-            replacement_data.get('shop'),
-            replacement_data.get('replacement_worker_full_name'),
-            worker_id,
-            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        ]
-        sheet.append(row_data)
-        workbook.save(filepath)
-        logging.info(f"Дані успішно записано у файл: {filepath}")
-    except Exception as e:
-        logging.error(f"Помилка при записі в Excel: {e}")
+def write_report_workbook(filepath: str, rows: Iterable[tuple], fill_times: Optional[dict] = None):
+    """
+    Записує звіт у потоковому режимі openpyxl (write_only): рядки одразу йдуть у файл,
+    тож пам'ять не залежить від кількості замін за місяць. Якщо передано fill_times
+    (database.get_fill_time_percentiles), додає аркуш із перцентилями часу закриття.
+    """
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Звіт по замінах")
+    for column, width in COLUMN_WIDTHS.items():
+        sheet.column_dimensions[column].width = width
+
+    header_cells = []
+    for header in REPORT_HEADERS:
+        cell = WriteOnlyCell(sheet, value=header)
+        style_header_cell(cell)
+        header_cells.append(cell)
+    sheet.append(header_cells)
+
+    for row in rows:
+        sheet.append(row)
+
+    if fill_times and fill_times['city']:
+        fill_sheet = workbook.create_sheet("Час закриття")
+        for column, width in FILL_TIME_COLUMN_WIDTHS.items():
+            fill_sheet.column_dimensions[column].width = width
+        header_cells = []
+        for header in FILL_TIME_HEADERS:
+            cell = WriteOnlyCell(fill_sheet, value=header)
+            style_header_cell(cell)
+            header_cells.append(cell)
+        fill_sheet.append(header_cells)
+
+        def fill_row(name: str, stats: dict) -> list:
+            return [name, stats['count']] + [round(stats[key] / 60, 1) for key in ('p50', 'p90', 'p99')]
+
+        fill_sheet.append(fill_row("Усе місто", fill_times['city']))
+        for shop, stats in fill_times['shops'].items():
+            fill_sheet.append(fill_row(shop, stats))
+    workbook.save(filepath)
+
+def build_report(db_path: str, reports_dir: str, for_date: datetime = None) -> Optional[str]:
+    """
+    Повертає шлях до .xlsx-звіту за місяць дати for_date, зібраного з журналу report_events.
+    Файл - лише кеш журналу: він перебудовується (за O(подій місяця)), коли в журналі з'явилися
+    нові рядки або файлу немає. Якщо подій за місяць немає - None.
+    """
+    report_month = get_report_month(for_date)
+    filepath = get_report_filename(reports_dir, for_date)
+    with _build_lock:
+        summary = db.get_report_month_summary(db_path, report_month)
+        if summary is None:
+            return None
+        last_event_id = summary['last_event_id']
+        if summary['built_event_id'] == last_event_id and os.path.exists(filepath):
+            return filepath
+
+        month_start = datetime.strptime(report_month, '%Y-%m')
+        next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+        fill_times = db.get_fill_time_percentiles(
+            db_path, int(month_start.timestamp()), int(next_month_start.timestamp())
+        )
+
+        tmp_path = f"{filepath}.tmp"
+        write_report_workbook(tmp_path, db.iter_report_events(db_path, report_month), fill_times)
+        os.replace(tmp_path, filepath)
+        db.mark_report_built(db_path, report_month, last_event_id)
+        logging.info(f"Звіт {filepath} зібрано з журналу (до події {last_event_id}).")
+        return filepath
 
 if __name__ == '__main__':
+    DB_FILE_EXAMPLE = 'reports_example/bulka_example.db'
     REPORTS_DIR_EXAMPLE = 'reports_example'
     print(f"Назва файлу звіту: {get_report_filename(REPORTS_DIR_EXAMPLE)}")
     test_data = {
@@ -90,5 +144,6 @@ if __name__ == '__main__':
         'shop': 'Магазин #1 (Центр)',
         'replacement_worker_username': 'worker_test_user'
     }
-    record_replacement_to_excel(REPORTS_DIR_EXAMPLE, test_data)
-    print("Тестовий запис у файл виконано.")
\ No newline at end of file
+    db.init_db(DB_FILE_EXAMPLE)
+    db.add_report_events(DB_FILE_EXAMPLE, [test_data])
+    print(f"Тестовий звіт зібрано: {build_report(DB_FILE_EXAMPLE, REPORTS_DIR_EXAMPLE)}")
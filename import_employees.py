@@ -0,0 +1,78 @@
+"""Імпорт списку працівників міста з CSV або JSON файлу в базу працівників."""
+
+import argparse
+import csv
+import json
+import os
+from typing import List, Tuple
+
+from config import CITIES_CONFIG
+from database import init_employees_db, sync_employees, upsert_employees
+
+
+def load_roster(path: str) -> List[Tuple[int, str]]:
+    """
+    Читає список працівників. CSV - колонки user_id,full_name (рядок заголовка необов'язковий);
+    JSON - список об'єктів {"user_id": ..., "full_name": ...} або пар [user_id, full_name].
+    """
+    if os.path.splitext(path)[1].lower() == '.json':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        rows = [(item['user_id'], item['full_name']) if isinstance(item, dict) else tuple(item) for item in data]
+    else:
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            rows = [tuple(row[:2]) for row in csv.reader(f) if row]
+        if rows and not rows[0][0].strip().lstrip('-').isdigit():
+            rows = rows[1:]
+
+    roster = []
+    for line_no, (user_id, full_name) in enumerate(rows, start=1):
+        full_name = str(full_name).strip()
+        if not full_name:
+            raise ValueError(f"Запис {line_no}: порожнє ім'я для ID {user_id}")
+        roster.append((int(user_id), full_name))
+    return roster
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Імпорт працівників міста з CSV або JSON.")
+    parser.add_argument('city', choices=sorted(CITIES_CONFIG), help="Ключ міста з CITIES_CONFIG")
+    parser.add_argument('file', help="Файл зі списком працівників (.csv або .json)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--prune', action='store_true', help="Видалити працівників, яких немає у файлі")
+    mode.add_argument(
+        '--sync', action='store_true',
+        help="Синхронізувати базу з файлом (додати, оновити, видалити) і записати версію; незмінений список пропускається"
+    )
+    args = parser.parse_args()
+
+    db_path = CITIES_CONFIG[args.city]["employees_db_path"]
+    try:
+        roster = load_roster(args.file)
+        seen = set()
+        for user_id, full_name in roster:
+            if user_id in seen:
+                print(f"Увага: ID {user_id} зустрічається у файлі кілька разів, буде використано останній запис.")
+            seen.add(user_id)
+        init_employees_db(db_path, CITIES_CONFIG[args.city].get("storage_profile"))
+        if args.sync:
+            summary = sync_employees(db_path, roster, source=os.path.basename(args.file))
+        else:
+            summary = upsert_employees(db_path, roster, prune=args.prune)
+    except Exception as error:
+        print(f"Невдача: {error}")
+        return
+
+    if summary.get('skipped'):
+        print(f"Успішно: список не змінився з версії {summary['version']}, базу не змінено.")
+        return
+    if args.sync:
+        print(f"Синхронізацію записано як версію {summary['version']}.")
+    print(
+        f"Успішно: додано {len(summary['added'])}, оновлено {len(summary['updated'])}, "
+        f"без змін {summary['unchanged']}, видалено {len(summary['removed'])}."
+    )
+
+
+if __name__ == "__main__":
+    main()
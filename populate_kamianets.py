@@ -1,127 +0,0 @@
-"""Populate employees database for Kamianets-Podilskyi city."""
-
-from typing import List, Tuple
-
-from config import CITIES_CONFIG
-from database import add_employee, delete_employee, init_employees_db
-
-
-# Напишіть список працівників тут у форматі: (ID, "Прізвище Ім'я")
-EMPLOYEES: List[Tuple[int, str]] = [
-    (2026590062, "Лисак Вікторія Степанівна"),
-    (5382469891, "Лисак Ірина Вікторівна"),
-    (5271898534, "Чорпіта Юлія Василівна"),
-    (5147780382, "Кобріна Наталія Миколаївна"),
-    (1788378499, "Колотушкіна Олександра Вадимівна"),
-    (1602175375, "Лисенко (Білоус) Вікторія Олександрівна"),
-    (6751851516, "Горділежова Анжела Володимирівна"),
-    (5301859571, "Яковчик Оксана Антонівна"),
-    (6401080964, "Коваль Тетяна Василівна"),
-    (5591895698, "Ярошевська Ася Володимирівна"),
-    (8072453438, "Кузьмова Оксана Михайлівна"),
-    (8381222619, "Пилипенко Інна Василівна"),
-    (7353080454, "Михайлюк Наталія Ростиславівна"),
-    (1833616869, "Скрепець Кирило Костянтинович"),
-    (1252465531, "Бучинська Наталія Віталіївна"),
-    (7726063123, "Спрід Марина Іванівна"),
-    (1483474254, "Мозолюк Ірина Анатоліївна"),
-    (7757963348, "Кочеткова Валентина Вікторівна"),
-    (5239459023, "Венгер Світлана Петрівна"),
-    (2057904407, "Ковальчук Людмила Вікторівна"),
-    (591125239, "Бринюк Олеся Олександрівна"),
-    (5262294684, "Посунько Тетяна Миколаївна"),
-    (1524864359, "Надточій Тетяна Олександрівна"),
-    (934889234, "Мутас Ірина Валентинівна"),
-    (1412152628, "Шебеко Дар'я Олександрівна"),
-    (8437267288, "Бевза Юлія Василівна"),
-    (1145912406, "Сідєльнікова Наталія Василівна"),
-    (8011634320, "Лужняк Тетяна Василівна"),
-    (5084000114, "Сапила Наталія Богданівна"),
-    (5041720347, "Фурман Лариса Олександрівна"),
-    (1865110608, "Барняк Людмила Олександрівна"),
-    (5826397944, "Опалінська Олена Михайлівна"),
-    (5175863439, "Василівська Наталія Петрівна"),
-    (1572123829, "Ткач Уляна Віталіївна"),
-    (8084006954, "Яремчук Марина Валеріївна"),
-    (7041441963, "Брітанова Ганна Олександрівна"),
-    (617835879, "Мороз Вадим Віталійович"),
-    (2026201782, "Лагодзінський Максим Дмитрович"),
-    (6597065914, "Гринь Марина Романівна"),
-    (7093466786, "Тручок Вікторія Віталіївна"),
-    (7767146505, "Танасійчук Оксана Олександрівна"),
-    (5730706445, "Бойчук Ольга Миколаївна"),
-    (1769497625, "Журенко Віта Василівна"),
-    (7964092071, "Гончарук Юлія Ігорівна"),
-    (942467989, "Романишена Анастасія Ігорівна"),
-    (5191557258, "Ціхоцька Лілія Борисівна"),
-    (7617860963, "Заворотна Наталія Володимирівна"),
-    (1428171660, "Гончарук Любов Михайлівна"),
-    (5384824504, "Маркова Надія Ігорівна"),
-    (1564956102, "Шиманська Юлія Богданівна"),
-    (833978855, "Грищук Ангеліна Володимирівна"),
-    (7900809834, "Попель Ірина Іванівна"),
-    (1794085314, "Сковородник Каріна Іванівна"),
-    (5064908179, "Глєбова Анжеліка Едуардівна"),
-    (1660883060, "Мельшенкер Наталія Вікторівна"),
-    (810688144, "Онищук Маріна Іванівна"),
-    (5807347507, "Літвінова Інна Олександрівна"),
-    (7825922599, "Співак (Яремій) Христина Тарасівна"),
-    (868374156, "Фінтісова Тетяна Дмитрівна"),
-    (1081599954, "Сідько Катерина Валеріївна"),
-    (6142142491, "Турик Сергій Анатолійович"),
-    (8113044733, "Бойко Інна Володимирівна"),
-    (5165035513, "Болдарєва Марина Володимирівна"),
-    (5703208788, "Петришин Мар’яна Анатоліївна"),
-    (1967870899, "Кошинська Юлія Василівна"),
-    (7019434692, "Якубовська Оксана Данилівна"),
-    (1818475080, "Софронюк Світлана Вікторівна"),
-    (1416555437, "Шегера Оксана Ігорівна"),
-    (8223559639, "Коваль Олена Олександрівна"),
-    (1425910552, "Довгань Лілія Василівна"),
-    (869478956, "Онищук Олександр Михайлович"),
-    (1821408863, "Гречана Олена Юріївна"),
-    (5231812926, "Чорненька Олена Валеріївна"),
-    (1471045101, "Сорокіна Тетяна Миколаївна"),
-    (5344197452, "Лисенко Наталія Анатоліївна"),
-    (8354485771, "Ковальчук Назар Юрійович"),
-    (6256732922, "Михайлюк Ніна Дмитрівна"),
-    (7581889559, "Бойчук Марія Андріївна"),
-    (644416656, "Головатюк Сергій Анатолійович"),
-    (5576585224, "Турик Надія Анатоліївна"),
-    (5843180284, "Котик Людмила Миколаївна"),
-    (1711871996, "Іванова Наталія Іванівна"),
-    (830729982, "Денисенко Дар'я Миколаївна"),
-    (1026718695, "Красильнікова Світлана Володимирівна"),
-    (8377817519, "Козак Світлана Порфирівна"),
-    (7181242096, "Іванова Світлана Миколаївна"),
-    (1420993789, "Раєцька Лариса Володимирівна"),
-    (5278703169, "Ярославська Лариса Іванівна"),
-    (5226267903, "Тютюнко Мар'яна Борисівна"),
-    (1132501128, "Римар Ольга Олександрівна"),
-    (5252244149, "Драпата Оксана Олександрівна"),
-    (1389276189, "Морозова Людмила Михайлівна"),
-    (5633668731, "Постоловська Ольга Володимирівна"),
-    (6364697640, "Гуцол Інна Олександрівна"),
-]
-
-CITY_KEY = "kamianets"
-
-
-def main() -> None:
-    city_config = CITIES_CONFIG[CITY_KEY]
-    db_path = city_config["employees_db_path"]
-
-    try:
-        init_employees_db(db_path)
-        for user_id, full_name in EMPLOYEES:
-            delete_employee(db_path, user_id)
-            add_employee(db_path, user_id, full_name)
-    except Exception as error:
-        print(f"Невдача: {error}")
-        return
-
-    print("Успішно")
-
-
-if __name__ == "__main__":
-    main()
@@ -1,101 +0,0 @@
-"""Populate employees database for Kamianets-Podilskyi (own production)."""
-
-from typing import List, Tuple
-
-from config import CITIES_CONFIG
-from database import add_employee, delete_employee, init_employees_db
-
-
-# Напишіть список працівників тут у форматі: (ID, "Прізвище Ім'я")
-EMPLOYEES: List[Tuple[int, str]] = [
-    (1722541583, "Майданська Тетяна Леонідівна"),
-    (5797594853, "Денисюк Тетяна Володимирівна"),
-    (5596761655, "Жмурко Алла Михайлівна"),
-    (5270149133, "Тисанюк Неля Андріївна"),
-    (1387940369, "Варик Зінаїда Олександрівна"),
-    (8402424515, "Роїк Наталія Миколаївна"),
-    (1001354828, "Шлапак Ірина Анатоліївна"),
-    (6599875278, "Івончик Оксана Володимирівна"),
-    (5248407672, "Арістова Інна Анатоліївна"),
-    (7073435710, "Григор'єва Лілія Станіславівна"),
-    (8189017974, "Хмельовська Оксана Миколаївна"),
-    (1060143708, "Помиканова Наталія Миколаївна"),
-    (5262844745, "Луценко Наталія Олександрівна"),
-    (7613185524, "Іваніцька Юлія Василівна"),
-    (778363184, "Гуль Олександра Михайлівна"),
-    (5566985456, "Коваль Наталія Валеріївна"),
-    (1313176831, "Боровська Ольга Володимирівна"),
-    (2138634388, "Паламарчук Марія Степанівна"),
-    (825743265, "Кожевнікова Олена Марківна"),
-    (1985319812, "Петрушевська Людмила Анатоліївна"),
-    (1445931033, "Піддубний Віктор Романович"),
-    (1064961801, "Мазур Іван Ігорович"),
-    (5336131317, "Хворова Оксана Станіславівна"),
-    (6222870775, "Бескровна Тетяна Адамівна"),
-    (1048435106, "Просандєєв Олександр Євгенович"),
-    (5550369822, "Августінова Вікторія Олександрівна"),
-    (5579914664, "Андрієшена Зоя Анатоліївна"),
-    (6288586468, "Боршуляк Оксана Миколаївна"),
-    (5132173744, "Стельмах Людмила Анатоліївна"),
-    (6993693497, "Степанишена Світлана Михайлівна"),
-    (5240274266, "Волощак Алла Іванівна"),
-    (1935713430, "Мищишена Наталія Вікторівна"),
-    (8206375365, "Тифанюк Лариса Миколаївна"),
-    (6236374750, "Гуцол Надія Павлівна"),
-    (1011396324, "Охрімець Наталія Вікторівна"),
-    (5617561412, "Ковтун Наталія Олександрівна"),
-    (910533389, "Волощук Ігор Олександрович"),
-    (5994621782, "Дацько Віта Миколаївна"),
-    (712385774, "Салецький Андрій Ігорович"),
-    (1528866652, "Муц Валентина Леонідівна"),
-    (6986791874, "Погуранська Галина Іванівна"),
-    (1073408044, "Саламаха Вікторія Миколаївна"),
-    (6945494012, "Сенчишина Тетяна Іванівна"),
-    (5241902493, "Діянчук Вікторія Віталіївна"),
-    (1982527043, "Сенчишина Марія Миколаївна"),
-    (8343126568, "Распаркіна Маргаріта Валентинівна"),
-    (8447509150, "Гарбузова Марина Миколаївна"),
-    (5266834027, "Чуловська Ольга Володимирівна"),
-    (5322578612, "Тарнавська Оксана Олександрівна"),
-    (8280763214, "Подліпна Аліна Олегівна"),
-    (666995879, "Жмурко Катерина Вячеславівна"),
-    (1603874432, "Кравчута Богдан Вікторович"),
-    (7657179837, "Подліпна Галина Петрівна"),
-    (5403529501, "Титянюк Ольга Русланівна"),
-    (2061928963, "Зарудня Наталія Іванівна"),
-    (8155653973, "Мельник Марина Миколаївна"),
-    (6594229691, "Печенога Людмила Михайлівна"),
-    (5181288296, "Доброшинська Олена Володимирівна"),
-    (5976107794, "Юр'єва Ілона Михайлівна"),
-    (6616296631, "Півень Тетяна Петрівна"),
-    (2083245970, "Клюєва Любов Сергіївна"),
-    (1100418956, "Михайлюк Тетяна Володимирівна"),
-    (5120909725, "Бабій Альона Петрівна"),
-    (955285924, "Качинська Іванна Іванівна"),
-    (1489348659, "Соловйова Наталія Зіновіївна"),
-    (5205525294, "Пасенко Вікторія Петрівна"),
-    (6329498442, "Паламарчук Надія Володимирівна"),
-    (4441935562, "Мороз Любов Миколаївна"),
-]
-
-CITY_KEY = "kamianets_vlasne"
-
-
-def main() -> None:
-    city_config = CITIES_CONFIG[CITY_KEY]
-    db_path = city_config["employees_db_path"]
-
-    try:
-        init_employees_db(db_path)
-        for user_id, full_name in EMPLOYEES:
-            delete_employee(db_path, user_id)
-            add_employee(db_path, user_id, full_name)
-    except Exception as error:
-        print(f"Невдача: {error}")
-        return
-
-    print("Успішно")
-
-
-if __name__ == "__main__":
-    main()
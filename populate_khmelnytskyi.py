@@ -1,132 +0,0 @@
-"""Populate employees database for Khmelnytskyi city."""
-
-from typing import List, Tuple
-
-from config import CITIES_CONFIG
-from database import add_employee, delete_employee, init_employees_db
-
-
-# Напишіть список працівників тут у форматі: (ID, "Прізвище Ім'я")
-EMPLOYEES: List[Tuple[int, str]] = [
-    (8254007899, "Лесь Валерія Ігорівна"),
-    (5568288215, "Шпирна Надія Миколаївна"),
-    (776616966, "Слободян Артем Романович"),
-    (1465522470, "Рижак Богдан Миколайович"),
-    (5688320501, "Іванчук Юрій Володимирович"),
-    (958355963, "Кравець Олена Антонівна"),
-    (5354757124, "Добрицька Анастасія Вікторівна"),
-    (1905163629, "Кулик Катерина Михайлівна"),
-    (5250350479, "Ковальчук Юлія Анатоліївна"),
-    (6198573821, "Дзекан Тетяна Володимирівна"),
-    (7511314023, "Клубіцька Вікторія Анатоліївна"),
-    (1446806135, "Глущик Любов Павлівна"),
-    (5627471796, "Медвєдєва Любов Миколаївна"),
-    (5863251566, "Музика Наталія Михайлівна"),
-    (6025013542, "Черевична Людмила Миколаївна"),
-    (5197863907, "Капашинова Євгенія Сергіївна"),
-    (1335072642, "Краковська Інна Олегівна"),
-    (1238340080, "Стаднюк Діана Петрівна"),
-    (5448959717, "Матвійчук Світлана Василівна"),
-    (5778450450, "Лопата Аліна Василівна"),
-    (1236965255, "Бородій Юлія Володимирівна"),
-    (1780175501, "Скалецька Ольга Миколаївна"),
-    (858141811, "Свирида Микола Анатолійович"),
-    (1577578809, "Галузінська Анастасія Валентинівна"),
-    (2118541317, "Ткачук Юлія Миколаївна"),
-    (1459662240, "Шевчук Ольга Володимирівна"),
-    (5472326857, "Бялківська Наталія Сергіївна"),
-    (7489008046, "Калачник Жанна Анатоліївна"),
-    (7036001038, "Гнатюк Жанна Михайлівна"),
-    (5234465303, "Шевчук Лілія Броніславівна"),
-    (5189259240, "Загородня Олександра Григорівна"),
-    (6836199109, "Кушнір Лілія Миколаївна"),
-    (1124614291, "Ференц (Секретар) Юлія Володимирівна"),
-    (2066467018, "Босюк Артур Олегович"),
-    (5280903597, "Лункіна Ірина Антонівна"),
-    (2146200962, "Шпорт Світлана Володимирівна"),
-    (5225692379, "Оксенюк Ольга Михайлівна"),
-    (7863309527, "Глушак Тетяна Вікторівна"),
-    (5197467140, "Чиж Анжела Валеріївна"),
-    (1980254966, "Наумчук Юлія Валентинівна"),
-    (1477368086, "Захаренко Катерина Петрівна"),
-    (633176395, "Сташевська Валентина Сергіївна"),
-    (5239721988, "Побережна Інна Вікторівна"),
-    (5040201031, "Попович Ольга Борисівна"),
-    (775216356, "Дігтяр Юлія Василівна"),
-    (1897944693, "Денисюк Наталія Василівна"),
-    (1449779660, "Романюк Ольга Іванівна"),
-    (5688484328, "Довгань Тетяна Олександрівна"),
-    (6273782662, "Кшецька Тетяна Анатоліївна"),
-    (833538159, "Федченок Світлана Геннадіївна"),
-    (2022271283, "Остапенко Дар'я Сергіївна"),
-    (5312202252, "Коробко Юлія Олександрівна"),
-    (5942065278, "Тарасюк Ірина Ігорівна"),
-    (5592576858, "Горгата Лариса Миколаївна"),
-    (1741652508, "Олійник Наталя Леонідівна"),
-    (512276293, "Яблонська Тетяна Миколаївна"),
-    (7460639865, "Мельничук Оксана Петрівна"),
-    (8281630573, "Гура Надія Володимирівна"),
-    (5284640014, "Навроцька Ірина Анатоліївна"),
-    (6330750060, "Купрата Любов Сергіївна"),
-    (6875384417, "Панчук Аліна Олександрівна"),
-    (6805998551, "Галкін Денис Вікторович"),
-    (8056307866, "Коломієць Олена Леонідівна"),
-    (1214960566, "Юсупова Тетяна Олександрівна"),
-    (613703732, "Іванова Анастасія Олексіївна"),
-    (672537272, "Желай Вероніка Миколаївна"),
-    (948160372, "Грохольська Яна Володимирівна"),
-    (5535583220, "Ямнєєва Аліна Степанівна"),
-    (504608786, "Танасійчук Тетяна Василівна"),
-    (621107975, "Чорна Діана Юхимівна"),
-    (7556023333, "Назарова Марія Миколаївна"),
-    (1133959828, "Кукшин Інна Вадимівна"),
-    (2094562461, "Козяр Валентина Григорівна"),
-    (698408585, "Дейнега Катерина Романівна"),
-    (996461173, "Миронова Світлана Анатоліївна"),
-    (5004377975, "Ястреб Марина Олександрівна"),
-    (1373879496, "Роїк Наталія Василівна"),
-    (6240242193, "Машталірук Наталія Вікторівна"),
-    (1977441208, "Долішній Артем Сергійович"),
-    (6013854751, "Катеринчук Світлана Іванівна"),
-    (5217067783, "Гладюк Наталія Олександрівна"),
-    (5544125950, "Розумний Владислав Олександрович"),
-    (5224721379, "Кондрашина Оксана Антонівна"),
-    (6625456658, "Зайченко Олена Іванівна"),
-    (6418434471, "Стріляєва Зоя Аполлінаріївна"),
-    (6661131650, "Янковська Інна Миколаївна"),
-    (572861173, "Лемець Олег Миколайович"),
-    (610814218, "Шевчук Сергій Олександрович"),
-    (5720312289, "Лещук Марина Георгіївна"),
-    (5100779640, "Мармій Наталія Анатоліївна"),
-    (1312340208, "Мединська Наталія Анатоліївна"),
-    (5202578281, "Тертична Ганна Григорівна"),
-    (999254351, "Ковальова Ганна Сергіївна"),
-    (2141710113, "Варда Ольга Ігорівна"),
-    (7548608610, "Купрата Вікторія Станіславівна"),
-    (1885777236, "Радчишена Алла Володимирівна"),
-    (7124914811, "Антонюк Надія Іванівна"),
-    (757179029, "Соловійчук Інна Миколаївна"),
-    (1495084875, "Осідак Людмила Ігорівна"),
-]
-
-CITY_KEY = "khmelnytskyi"
-
-
-def main() -> None:
-    city_config = CITIES_CONFIG[CITY_KEY]
-    db_path = city_config["employees_db_path"]
-
-    try:
-        init_employees_db(db_path)
-        for user_id, full_name in EMPLOYEES:
-            delete_employee(db_path, user_id)
-            add_employee(db_path, user_id, full_name)
-    except Exception as error:
-        print(f"Невдача: {error}")
-        return
-
-    print("Успішно")
-
-
-if __name__ == "__main__":
-    main()
@@ -1,92 +0,0 @@
-"""Populate employees database for Khmelnytskyi (own production)."""
-
-from typing import List, Tuple
-
-from config import CITIES_CONFIG
-from database import add_employee, delete_employee, init_employees_db
-
-
-# Напишіть список працівників тут у форматі: (ID, "Прізвище Ім'я")
-EMPLOYEES: List[Tuple[int, str]] = [
-    (5793492117, "Крук Людмила Антонівна"),
-    (5191950105, "Шавурська Наталія Миколаївна"),
-    (7702685524, "Гуцол Вікторія Антонівна"),
-    (727951641, "Ткачук Руслана Вікторівна"),
-    (7174252868, "Галянт Оксана Болеславівна"),
-    (5276533617, "Ткачук Наталія Романівна"),
-    (6682022069, "Гребенюк Галина Іванівна"),
-    (6012643740, "Волкотруб Алла Петрівна"),
-    (631985617, "Пастухова Юлія В'ячеславівна"),
-    (5534957712, "Чорна Оксана Миколаївна"),
-    (5878138696, "Доліба Оксана Володимирівна"),
-    (6004939184, "Ломаченко Наталія Олександрівна"),
-    (7269330987, "Зельницька Лариса Євгенівна"),
-    (6793535743, "Гуменна Надія Степанівна"),
-    (7408917704, "Танчук Жанна Тодорівна"),
-    (765932714, "Діхтярук Іванна Юріївна"),
-    (1266206816, "Савченко Антоніна Ігорівна"),
-    (5351524448, "Пентесько Марина Володимирівна"),
-    (5133064352, "Музика Лідія Анатоліївна"),
-    (1187296886, "Музика Світлана Сергіївна"),
-    (1995405446, "Насіяд Леся Миколаївна"),
-    (5186266400, "Дацюк Світлана Анатоліївна"),
-    (952779151, "Починок Тетяна Миколаївна"),
-    (983421228, "Майдан Жанна Володимирівна"),
-    (5966486994, "Мельник Галина Володимирівна"),
-    (7757097589, "Тимошенко Алла Вікторівна"),
-    (5710398481, "Ваколюк Катерина Анатоліївна"),
-    (6274694008, "Степанова Наталія Василівна"),
-    (7615055787, "Будніцька Оксана Михайлівна"),
-    (5391247235, "Козік Марина Миколаївна"),
-    (6738074244, "Карабка Наталія Павлівна"),
-    (5141387470, "Свідерський Олександр"),
-    (886981734, "Нетребенко Анна Тарасівна"),
-    (6738074244, "Погонець Тетяна Василівна"),
-    (1838480933, "Горбатюк Олена Василівна"),
-    (5387040928, "Коваль Анжела Євгеніївна"),
-    (1337218210, "Євіна Олена Євгенівна"),
-    (5151127336, "Сіра Алла Миколаївна"),
-    (5171870295, "Дворянінова Олена"),
-    (6124280446, "Чиркова Тетяна"),
-    (5996162625, "Кузьмак Віта Миколаївна"),
-    (7839352731, "Казакова Альона Григорівна"),
-    (1609903631, "Жулкевська Олена Ілларіївна"),
-    (5149510379, "Неменко Олена Василівна"),
-    (6756857765, "Іванова Лідія Леонідівна"),
-    (7005535378, "Котік Валентина Володимирівна"),
-    (1233896845, "Дзюрман Тетяна Володимирівна"),
-    (6384486506, "Бурлака Мирослава Володимирівна"),
-    (5706232565, "Лозінська Ірина Василівна"),
-    (5159404868, "Шацька Наталія Вікторівна"),
-    (1286771339, "Кульчицька Оксана Анатоліївна"),
-    (7383733410, "Бондар Ірина Володимирівна"),
-    (1991620579, "Гула Раїса Василівна"),
-    (7322253981, "Нагорна Оксана Григорівна"),
-    (8251226778, "Ордак Наталія Миколаївна"),
-    (5196252856, "Квасневська Тетяна Олександрівна"),
-    (5833646595, "Капуш Катерина Петрівна"),
-    (5032672055, "Шульга Наталія Валентинівна"),
-    (5597533068, "Сергєєва Олена Володимирівна"),
-]
-
-CITY_KEY = "khmelnytskyi_vlasne"
-
-
-def main() -> None:
-    city_config = CITIES_CONFIG[CITY_KEY]
-    db_path = city_config["employees_db_path"]
-
-    try:
-        init_employees_db(db_path)
-        for user_id, full_name in EMPLOYEES:
-            delete_employee(db_path, user_id)
-            add_employee(db_path, user_id, full_name)
-    except Exception as error:
-        print(f"Невдача: {error}")
-        return
-
-    print("Успішно")
-
-
-if __name__ == "__main__":
-    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Optional
+
+import database as db
+import excel
+
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ReportWriter(threading.Thread):
+    """
+    Фоновий потік, який єдиний пише в журнал звітів і в .xlsx-файли міста.
+    Обробники лише кладуть завдання в обмежену чергу; пачка подій, що накопичилася,
+    записується однією транзакцією, а однакові запити на збирання файлу виконуються один раз.
+    """
+
+    def __init__(self, db_path: str, reports_dir: str, max_queue_size: int = 1000, max_batch_size: int = 500):
+        super().__init__(name=f"report-writer:{reports_dir}", daemon=True)
+        self.db_path = db_path
+        self.reports_dir = reports_dir
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue(maxsize=max_queue_size)
+
+    def record(self, replacements: list):
+        """Ставить завершені заявки в чергу на запис у журнал звіту."""
+        if not replacements:
+            return
+        try:
+            self._queue.put(('events', list(replacements)), timeout=5)
+        except queue.Full:
+            logger.warning(f"Черга звітів ({self.reports_dir}) переповнена, записую {len(replacements)} подій напряму.")
+            db.add_report_events(self.db_path, replacements)
+
+    def build(self, for_date: datetime = None, timeout: float = 120) -> Optional[str]:
+        """Просить потік зібрати звіт за місяць for_date і чекає на шлях до файлу (None, якщо даних немає)."""
+        future = Future()
+        self._queue.put(('build', (for_date, future)))
+        return future.result(timeout=timeout)
+
+    def stop(self, timeout: float = 30):
+        """Дописує все, що залишилося в черзі, і зупиняє потік."""
+        self._queue.put((_STOP, None))
+        self.join(timeout)
+
+    def run(self):
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            events = []
+            builds = {}
+            for kind, payload in batch:
+                if kind is _STOP:
+                    running = False
+                elif kind == 'events':
+                    events.extend(payload)
+                else:
+                    for_date, future = payload
+                    builds.setdefault(excel.get_report_month(for_date), (for_date, []))[1].append(future)
+
+            if events:
+                try:
+                    db.add_report_events(self.db_path, events)
+                except Exception as e:
+                    logger.error(f"Не вдалося записати {len(events)} подій у журнал звіту ({self.reports_dir}): {e}")
+
+            for for_date, futures in builds.values():
+                try:
+                    filepath = excel.build_report(self.db_path, self.reports_dir, for_date)
+                except Exception as e:
+                    logger.error(f"Не вдалося зібрати звіт ({self.reports_dir}): {e}")
+                    for future in futures:
+                        future.set_exception(e)
+                else:
+                    for future in futures:
+                        future.set_result(filepath)
+
+        db.close_connections()
+        logger.info(f"Потік запису звітів ({self.reports_dir}) зупинено.")
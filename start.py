@@ -1,76 +1,270 @@
 # -*- coding: utf-8 -*-
 
+import argparse
 import multiprocessing
+import os
+import queue
+import subprocess
+import sys
 import time
 import logging
 import warnings
-from config import CITIES_CONFIG, DEVELOPER_IDS
+from typing import Optional
+from config import CITIES_CONFIG, DEVELOPER_IDS, WEBHOOK_CONFIG
 from database import add_user, init_db, init_employees_db
 
 
 logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def bootstrap_and_run(city_config: dict):
-    """
-    Повна процедура для одного міста:
-    1. Налаштування логування та попереджень для дочірнього процесу.
-    2. Перевірка токена.
-    3. Ініціалізація БД та додавання розробників.
-    4. Запуск бота.
-    """
-    
+STATUS_OK = "OK"
+STATUS_FAILED = "FAILED"
+STATUS_SKIPPED = "SKIPPED"
+
+# Перезапуск дочірніх процесів: затримка подвоюється після кожного падіння (до RESTART_MAX_DELAY),
+# а якщо процес пропрацював довше RESTART_STABLE_AFTER секунд, лічильник падінь скидається.
+RESTART_BASE_DELAY = 2
+RESTART_MAX_DELAY = 300
+RESTART_STABLE_AFTER = 600
+
+def configure_runtime_logging():
+    """Приглушує попередження та шум APScheduler у процесі, де працюють боти."""
     warnings.filterwarnings("ignore", category=UserWarning)
     logging.getLogger('apscheduler').setLevel(logging.WARNING)
-    
-    from bot import run_bot
-    
+
+def bootstrap_city(city_config: dict) -> str:
+    """
+    Перевіряє токен міста, ініціалізує БД та додає розробників.
+    Повертає STATUS_OK, якщо бота міста можна запускати, інакше STATUS_SKIPPED або STATUS_FAILED.
+    """
     city_name = city_config['city_name']
 
     if "YOUR_" in city_config["telegram_bot_token"]:
         logger.warning(f"Токен для '{city_name}' не встановлено. Пропускається запуск.")
         print(f"Бот {city_name} | Status | - SKIPPED (Token not set)")
-        return
+        return STATUS_SKIPPED
 
     db_path = city_config['db_path']
     employees_db_path = city_config['employees_db_path']
+    storage_profile = city_config.get('storage_profile')
     try:
-        init_db(db_path)
-        init_employees_db(employees_db_path)
+        init_db(db_path, storage_profile)
+        init_employees_db(employees_db_path, storage_profile)
         for dev_id in DEVELOPER_IDS:
             add_user(db_path, dev_id, 'developer')
         print(f"База даних {city_name} | Status | - OK")
     except Exception as e:
         logger.error(f"Не вдалося налаштувати БД для '{city_name}': {e}")
         print(f"База даних {city_name} | Status | - FAILED")
+        return STATUS_FAILED
+    return STATUS_OK
+
+def bootstrap_and_run(city_key: str, city_config: dict, status_queue: Optional[multiprocessing.Queue] = None):
+    """
+    Повна процедура для одного міста:
+    1. Налаштування логування та попереджень для дочірнього процесу.
+    2. Перевірка токена.
+    3. Ініціалізація БД та додавання розробників.
+    4. Запуск бота.
+    Про кожен етап (db, bot) процес повідомляє супервізор через status_queue.
+    """
+    
+    configure_runtime_logging()
+
+    def report(stage: str, status: str):
+        if status_queue is not None:
+            status_queue.put((city_key, stage, status))
+    
+    from bot import run_bot
+    
+    db_status = bootstrap_city(city_config)
+    report('db', db_status)
+    if db_status != STATUS_OK:
         return
 
     try:
-        run_bot(city_config)
+        run_bot(city_config, on_started=lambda: report('bot', STATUS_OK))
     except Exception as e:
-        logger.error(f"Критична помилка при запуску процесу для '{city_name}': {e}")
-        print(f"Бот {city_name} | Status | - FAILED")
+        logger.error(f"Критична помилка при запуску процесу для '{city_config['city_name']}': {e}")
+        print(f"Бот {city_config['city_name']} | Status | - FAILED")
 
+def run_single_process(city_configs: list, webhook_config: Optional[dict] = None):
+    """Запускає ботів усіх міст в поточному процесі (див. bot.run_bots), за потреби - через webhook."""
+    configure_runtime_logging()
 
-if __name__ == "__main__":
-    processes = []
-    print("--- Запуск ботів BULKA Заміни ---")
+    from bot import run_bots
+
+    ready_configs = [config for config in city_configs if bootstrap_city(config) == STATUS_OK]
+    if not ready_configs:
+        print("Немає жодного міста для запуску.")
+        return
+
+    print("\n--- Боти працюють в одному процесі. Для зупинки натисніть Ctrl+C. ---")
+    run_bots(ready_configs, webhook_config=webhook_config)
+    print("--- Усі боти зупинено. ---")
+
+
+def profile_startup(limit: int = 25):
+    """Друкує модулі, імпорт яких найдовше затримує холодний старт бота (за даними python -X importtime)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import bot"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|", 2)
+        timings.append((int(cumulative_us), int(self_us), module.rstrip()))
+    if result.returncode != 0 or not timings:
+        print(f"Не вдалося виміряти імпорт бота:\n{result.stderr}")
+        return
 
-    for city_key, config in CITIES_CONFIG.items():
-        process = multiprocessing.Process(target=bootstrap_and_run, args=(config,))
-        processes.append(process)
+    total_us = max(cumulative for cumulative, _, _ in timings)
+    print(f"--- Імпорт bot: {total_us / 1000:.1f} мс, найповільніші модулі ---")
+    print(f"{'Разом, мс':>10} | {'Власний, мс':>11} | Модуль")
+    for cumulative_us, self_us, module in sorted(timings, reverse=True)[:limit]:
+        print(f"{cumulative_us / 1000:>10.1f} | {self_us / 1000:>11.1f} | {module}")
+
+
+class Supervisor:
+    """
+    Запускає процес на кожне місто одночасно, збирає звіти про готовність,
+    друкує зведену таблицю статусів і перезапускає процеси, що впали, з наростаючою затримкою.
+    """
+
+    def __init__(self, city_configs: dict):
+        self.city_configs = city_configs
+        self.status_queue = multiprocessing.Queue()
+        self.children = {
+            city_key: {"process": None, "db": "...", "bot": "...", "crashes": 0, "started_at": 0.0, "restart_at": None}
+            for city_key in city_configs
+        }
+        self.table_printed = False
+
+    def start_child(self, city_key: str):
+        child = self.children[city_key]
+        process = multiprocessing.Process(
+            target=bootstrap_and_run,
+            args=(city_key, self.city_configs[city_key], self.status_queue),
+            name=f"bot:{city_key}",
+        )
         process.start()
-        time.sleep(3)
+        child.update(process=process, db="...", bot="...", started_at=time.monotonic(), restart_at=None)
 
-    print("\n--- Статус запуску завершено. Боти працюють у фоновому режимі. ---")
-    print("Для зупинки натисніть Ctrl+C.")
+    def print_table(self):
+        print("\n--- Статус ботів ---")
+        print(f"{'Місто':<32} | {'БД':<8} | {'Бот':<10} | Перезапусків")
+        for city_key, child in self.children.items():
+            city_name = self.city_configs[city_key]['city_name']
+            print(f"{city_name:<32} | {child['db']:<8} | {child['bot']:<10} | {child['crashes']}")
+        print()
 
-    try:
-        for process in processes:
-            process.join()
-    except KeyboardInterrupt:
-        print("\n--- Отримано сигнал зупинки. Завершення роботи ботів... ---")
-        for process in processes:
-            process.terminate() 
-            process.join()
-        print("--- Усі процеси ботів зупинено. ---")
\ No newline at end of file
+    def startup_finished(self) -> bool:
+        return all(child['bot'] != "..." or child['db'] not in ("...", STATUS_OK) for child in self.children.values())
+
+    def handle_status(self, city_key: str, stage: str, status: str):
+        child = self.children[city_key]
+        child[stage] = status
+        if stage == 'db' and status != STATUS_OK:
+            child['bot'] = STATUS_SKIPPED if status == STATUS_SKIPPED else STATUS_FAILED
+        if self.table_printed:
+            print(f"Бот {self.city_configs[city_key]['city_name']} | {stage} | - {status}")
+
+    def check_children(self):
+        now = time.monotonic()
+        for city_key, child in self.children.items():
+            process = child['process']
+            if child['restart_at'] is not None:
+                if now >= child['restart_at']:
+                    logger.info(f"Перезапускаю бота '{self.city_configs[city_key]['city_name']}' (спроба {child['crashes']}).")
+                    self.start_child(city_key)
+                continue
+            if process is None or process.is_alive() or child['db'] == STATUS_SKIPPED:
+                continue
+
+            if now - child['started_at'] >= RESTART_STABLE_AFTER:
+                child['crashes'] = 0
+            delay = min(RESTART_MAX_DELAY, RESTART_BASE_DELAY * 2 ** child['crashes'])
+            child['crashes'] += 1
+            child['bot'] = "DOWN"
+            child['restart_at'] = now + delay
+            logger.warning(
+                f"Процес бота '{self.city_configs[city_key]['city_name']}' завершився (код {process.exitcode}). "
+                f"Перезапуск через {delay} с."
+            )
+
+    def run(self):
+        if multiprocessing.get_start_method() == 'fork':
+            # Дочірні процеси успадкують уже імпортований bot замість того, щоб імпортувати його щоразу.
+            import bot  # noqa: F401
+
+        for city_key in self.city_configs:
+            self.start_child(city_key)
+
+        while True:
+            try:
+                self.handle_status(*self.status_queue.get(timeout=1))
+                continue
+            except queue.Empty:
+                pass
+            if not self.table_printed and self.startup_finished():
+                self.print_table()
+                self.table_printed = True
+                print("Боти працюють у фоновому режимі. Для зупинки натисніть Ctrl+C.")
+            self.check_children()
+
+    def stop(self, timeout: float = 15):
+        # Ctrl+C отримують і дочірні процеси: даємо їм коректно зупинитися, решту завершуємо примусово.
+        deadline = time.monotonic() + timeout
+        for child in self.children.values():
+            process = child['process']
+            if process is not None:
+                process.join(max(0, deadline - time.monotonic()))
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Запуск ботів BULKA Заміни.")
+    parser.add_argument(
+        "--single-process",
+        action="store_true",
+        help="запустити ботів усіх міст в одному процесі замість окремого процесу на місто",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="вивести час імпорту модулів бота та завершити роботу",
+    )
+    parser.add_argument(
+        "--webhook",
+        action="store_true",
+        help="отримувати оновлення через спільний webhook-сервер (WEBHOOK_CONFIG) в одному процесі",
+    )
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        profile_startup()
+        sys.exit(0)
+
+    print("--- Запуск ботів BULKA Заміни ---")
+
+    if args.webhook:
+        if not WEBHOOK_CONFIG["public_url"]:
+            print("Для режиму webhook вкажіть зовнішню адресу в BOT_WEBHOOK_URL (WEBHOOK_CONFIG['public_url']).")
+            sys.exit(1)
+        run_single_process(list(CITIES_CONFIG.values()), webhook_config=WEBHOOK_CONFIG)
+    elif args.single_process:
+        run_single_process(list(CITIES_CONFIG.values()))
+    else:
+        supervisor = Supervisor(CITIES_CONFIG)
+        try:
+            supervisor.run()
+        except KeyboardInterrupt:
+            print("\n--- Отримано сигнал зупинки. Завершення роботи ботів... ---")
+            supervisor.stop()
+            print("--- Усі процеси ботів зупинено. ---")
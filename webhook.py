@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Спільний локальний HTTP-сервер для режиму webhook: приймає оновлення всіх міських ботів
+і за токеном у шляху запиту передає їх у чергу диспетчера відповідного бота.
+Запуск з консолі відтворює записані оновлення на локальний сервер (для перевірки без Telegram).
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, Optional
+
+from flask import Flask, abort, request
+from telegram import Update
+from telegram.ext import Updater
+from werkzeug.serving import make_server
+
+
+logger = logging.getLogger(__name__)
+
+
+def create_app(updaters: Dict[str, Updater], record_path: Optional[str] = None) -> Flask:
+    """
+    Створює Flask-застосунок, що приймає POST /<токен бота>. Оновлення лише ставиться в чергу
+    диспетчера, тож Telegram отримує відповідь одразу. Якщо задано record_path, кожне
+    оновлення дописується туди рядком JSON (для подальшого відтворення командою replay).
+    """
+    app = Flask(__name__)
+    record_lock = threading.Lock()
+
+    @app.route('/<token>', methods=['POST'])
+    def receive_update(token: str):
+        updater = updaters.get(token)
+        if updater is None:
+            abort(404)
+        data = request.get_json(force=True, silent=True)
+        if not data:
+            abort(400)
+
+        if record_path:
+            with record_lock, open(record_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"token": token, "update": data}, ensure_ascii=False) + "\n")
+
+        updater.dispatcher.update_queue.put(Update.de_json(data, updater.bot))
+        return '', 200
+
+    @app.route('/health', methods=['GET'])
+    def health():
+        return {"bots": len(updaters)}, 200
+
+    return app
+
+
+class WebhookServer(threading.Thread):
+    """Фоновий потік з HTTP-сервером webhook для всіх ботів процесу."""
+
+    def __init__(self, updaters: Dict[str, Updater], listen: str, port: int, record_path: Optional[str] = None):
+        super().__init__(name="webhook-server", daemon=True)
+        self.server = make_server(listen, port, create_app(updaters, record_path), threaded=True)
+
+    def run(self):
+        logger.info(f"Webhook-сервер слухає {self.server.host}:{self.server.port}.")
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.join(5)
+
+
+def replay(path: str, base_url: str, token: Optional[str] = None, delay: float = 0.0) -> int:
+    """
+    Надсилає записані оновлення (рядки JSON з полями token і update) на base_url/<токен>,
+    як це робив би Telegram. token замінює записаний токен. Повертає кількість прийнятих оновлень.
+    """
+    # Файл читається повністю заздалегідь: сервер може дописувати в нього ж відтворені оновлення.
+    with open(path, encoding='utf-8') as f:
+        lines = f.readlines()
+
+    accepted = 0
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        url = f"{base_url.rstrip('/')}/{token or record['token']}"
+        body = json.dumps(record['update']).encode('utf-8')
+        req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method='POST')
+        try:
+            with urllib.request.urlopen(req, timeout=10) as response:
+                accepted += response.status == 200
+        except urllib.error.URLError as e:
+            print(f"Рядок {line_no}: не вдалося надіслати оновлення ({e}).")
+        if delay:
+            time.sleep(delay)
+    return accepted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Інструменти режиму webhook.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    replay_parser = subparsers.add_parser('replay', help="Відтворити записані оновлення на локальний сервер")
+    replay_parser.add_argument('file', help="Файл із записаними оновленнями (JSON Lines)")
+    replay_parser.add_argument('--url', default="http://127.0.0.1:8443", help="Адреса webhook-сервера")
+    replay_parser.add_argument('--token', help="Надсилати всі оновлення на цей токен замість записаного")
+    replay_parser.add_argument('--delay', type=float, default=0.0, help="Пауза між оновленнями, с")
+    args = parser.parse_args()
+
+    accepted = replay(args.file, args.url, args.token, args.delay)
+    print(f"Прийнято оновлень: {accepted}.")
+
+
+if __name__ == "__main__":
+    main()